@@ -1,9 +1,16 @@
 # analyzers.py
 import pandas as pd
+import numpy as np
 import re
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from datetime import datetime
-from openpyxl import load_workbook
+from functools import lru_cache
+from column_profile import frame_profile
+from near_duplicates import find_near_duplicates
+from outliers import get_detector
+from dateutil.parser import parse as parse_datetime
+from loaders import load_xlsx_metadata
 import dateparser
 UNK_TOKENS = {"UNK", "???", "###", "N/A", "NA", "-", "NULL", "？", "؟", ""}
 
@@ -11,7 +18,7 @@ def cell_ref(row_idx: int, col_idx: int) -> str:
     col_letter = chr(65 + col_idx)
     return f"{col_letter}{row_idx + 2}"
 
-def detect_and_parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+def date_pattern() -> re.Pattern:
     date_regexes = [
         r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
     ]
@@ -35,20 +42,69 @@ def detect_and_parse_dates(df: pd.DataFrame) -> pd.DataFrame:
         fr'\b{weekdays_en}\s+{months_en}\s+\d{{1,2}},?\s*\d{{4}}\b',
         fr'\b{weekdays_ar}\s+{months_ar}\s+\d{{1,2}},?\s*\d{{4}}\b',
     ]
-    combined_pattern = re.compile('|'.join(date_regexes), flags=re.IGNORECASE)
-    for col in df.columns:
-        if df[col].dtype == object:
-            def parse_cell(val):
-                if not isinstance(val, str):
-                    return val
-                m = combined_pattern.search(val)
-                if m:
-                    return dateparser.parse(m.group(), languages=['en', 'ar'])
-                return val
-            df[col] = df[col].map(parse_cell)
+    return re.compile('|'.join(date_regexes), flags=re.IGNORECASE)
+
+DATE_PATTERN = date_pattern()
+# اليوم قبل الشهر عند التساوي (مثل dayfirst=True)
+DATE_FORMATS = [
+    "ISO8601", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d", "%Y.%m.%d",
+    "%d/%m/%y", "%d-%m-%y", "%d/%m/%Y %H:%M", "%d-%m-%Y %H:%M", "%Y/%m/%d %I:%M %p",
+    "%d-%b-%Y", "%d-%b-%y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y",
+]
+
+@lru_cache(maxsize=100_000)
+def parse_date_text(text: str):
+    return dateparser.parse(text, languages=['en', 'ar'])
+
+def detect_and_parse_dates(df: pd.DataFrame, sample_size: int = 200, formats: dict = None) -> pd.DataFrame:
+    """
+    يحوّل أعمدة النص التي كل قيمها تواريخ إلى datetime، ويُرجع DataFrame جديدًا (الأصلي لا يتغير).
+    الصيغة تُختار من عينة من القيم المميزة ثم يُحلَّل العمود كله بـ pd.to_datetime(format=...)،
+    و dateparser يُستدعى فقط للقيم المميزة التي لم تُحلل وفيها نص تاريخ (مع memo).
+    formats: dict يُحفظ فيه اختيار كل عمود (الصيغة، أو None إذا لم يكن تاريخًا) ويُعاد استخدامه
+    للدفعات التالية من نفس الملف (streaming.py)؛ الدفعة التي لا تُحلل كل قيمها يبقى عمودها نصًا.
+    """
+    out = df.copy(deep=False)
     for col in df.columns:
-        df[col] = pd.to_datetime(df[col], errors='ignore', dayfirst=True)
-    return df
+        series = df[col]
+        if series.dtype != object or (formats is not None and col in formats and formats[col] is None):
+            continue
+        non_null = series.dropna()
+        if non_null.empty or pd.api.types.infer_dtype(non_null, skipna=False) != "string":
+            continue
+        codes, uniques = pd.factorize(non_null.str.strip())
+        text = pd.Series(uniques, dtype=object)
+        if formats is not None and col in formats:
+            best = formats[col]
+        else:
+            sample = text.sample(sample_size, random_state=0) if len(text) > sample_size else text
+            best, best_ok = None, None
+            for fmt in DATE_FORMATS:
+                ok = pd.to_datetime(sample, format=fmt, errors="coerce").notna()
+                if best_ok is None or ok.sum() > best_ok.sum():
+                    best, best_ok = fmt, ok
+            # رفض سريع: قيمة في العينة لا تطابق أي صيغة ولا تحتوي نص تاريخ
+            if not sample[~best_ok].str.contains(DATE_PATTERN).all():
+                best = None
+            if formats is not None:
+                formats[col] = best
+            if best is None:
+                continue
+        parsed = pd.to_datetime(text, format=best, errors="coerce")
+        todo = parsed.isna().to_numpy()
+        if todo.any():
+            matched = text[todo].str.extract(f"({DATE_PATTERN.pattern})", flags=re.IGNORECASE)[0]
+            if matched.isna().any():
+                continue
+            try:
+                fallback = pd.to_datetime(matched.map(parse_date_text), errors="coerce")
+                if fallback.isna().any():
+                    continue
+                parsed[todo] = fallback.to_numpy()
+            except (TypeError, ValueError):
+                continue
+        out[col] = pd.Series(parsed.to_numpy()[codes], index=non_null.index).reindex(series.index)
+    return out
 
 class BaseAnalyzer(ABC):
     @abstractmethod
@@ -83,9 +139,10 @@ def register(cls: type[BaseAnalyzer]) -> type[BaseAnalyzer]:
 class MissingDataAnalyzer(BaseAnalyzer):
     def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
         issues = []
+        profile = frame_profile(df, kwargs)
         n_rows, n_cols = df.shape
         for c_idx, col in enumerate(df.columns):
-            if df[col].isna().all():
+            if profile[col].null_count == n_rows:
                 issues.append({
                     "column": col,
                     "issue": "All values Missing On Column",
@@ -94,7 +151,7 @@ class MissingDataAnalyzer(BaseAnalyzer):
                     "details": "Column is Empty",
                     "rows": "-"
                 })
-        full_missing = df.isna().all(axis=1)
+        full_missing = profile.full_missing
         rows = [cell_ref(i, 0) + f":{cell_ref(i, n_cols-1)}" 
                 for i in full_missing[full_missing].index]
         if rows:
@@ -111,8 +168,15 @@ class MissingDataAnalyzer(BaseAnalyzer):
 
 @register
 class DuplicateDataAnalyzer(BaseAnalyzer):
-    def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
+    """
+    duplicate_keys: أعمدة يجب أن تكون قيمها فريدة، كل عنصر اسم عمود أو قائمة أعمدة (مفتاح مركب)،
+    أو "auto" لكل عمود شبه فريد (95% من قيمه على الأقل مميزة).
+    """
+    auto_key_ratio = 0.95
+    def run(self, df: pd.DataFrame, near_duplicates: bool = False, near_duplicate_keys: list = None,
+            near_duplicate_threshold: float = None, duplicate_keys=None, **kwargs) -> list[dict]:
         issues = []
+        profile = frame_profile(df, kwargs)
         n_rows, _ = df.shape
         dup_mask = df.duplicated(keep=False)
         dup_rows = [cell_ref(i, 0) + f":{cell_ref(i, df.shape[1]-1)}"
@@ -126,16 +190,80 @@ class DuplicateDataAnalyzer(BaseAnalyzer):
                 "details": "identical rows",
                 "rows": ", ".join(dup_rows[:10]) + ("..." if len(dup_rows) > 10 else "")
             })
+        if near_duplicates:
+            groups = find_near_duplicates(df, near_duplicate_keys, near_duplicate_threshold, profile)
+            if groups:
+                positions = np.sort(np.concatenate(groups))
+                near_rows = [cell_ref(i, 0) + f":{cell_ref(i, df.shape[1]-1)}" for i in df.index[positions]]
+                first = " ~ ".join(f"Row {i + 2}" for i in df.index[groups[0][:3]])
+                issues.append({
+                    "column": ", ".join(k for k in near_duplicate_keys or [] if k in df.columns) or "ALL",
+                    "issue": "Near Duplicate Rows",
+                    "count": len(near_rows),
+                    "pct": f"{int(len(near_rows)/n_rows*100)}%",
+                    "details": (f"{len(groups)} groups of rows "
+                                + (f"at least {int(near_duplicate_threshold * 100)}% similar"
+                                   if near_duplicate_threshold is not None
+                                   else "within about one typo of each other")
+                                + f" after ignoring case and spaces (e.g. {first})"),
+                    "rows": ", ".join(near_rows[:10]) + ("..." if len(near_rows) > 10 else "")
+                })
+        for key in self.resolve_keys(df, duplicate_keys, profile) if duplicate_keys else []:
+            groups = self.key_duplicates(df, key, profile)
+            if not groups:
+                continue
+            c_idx = df.columns.get_loc(key[0])
+            rows = [cell_ref(i, c_idx) for group in groups for i in df.index[group]]
+            examples = "; ".join(
+                f"{', '.join(map(str, df.iloc[group[0]][key].tolist()))} x{len(group)} "
+                f"({', '.join(f'Row {i + 2}' for i in df.index[group[:5]])}{'...' if len(group) > 5 else ''})"
+                for group in groups[:3]
+            )
+            issues.append({
+                "column": ", ".join(key),
+                "issue": "Duplicate Key Values",
+                "count": len(rows),
+                "pct": f"{int(len(rows)/n_rows*100)}%",
+                "details": f"{len(groups)} repeated values: {examples}" + ("..." if len(groups) > 3 else ""),
+                "rows": ", ".join(rows[:10]) + ("..." if len(rows) > 10 else "")
+            })
         return issues
+    def resolve_keys(self, df: pd.DataFrame, duplicate_keys, profile) -> list[list]:
+        if duplicate_keys == "auto":
+            keys = []
+            for col in df.columns:
+                hashes = profile[col].hashes[~profile[col].null_mask.to_numpy()]
+                if len(hashes) > 1 and len(pd.unique(hashes)) >= self.auto_key_ratio * len(hashes):
+                    keys.append([col])
+            return keys
+        keys = [[key] if isinstance(key, str) else list(key) for key in duplicate_keys]
+        return [key for key in keys if key and all(col in df.columns for col in key)]
+    @staticmethod
+    def key_duplicates(df: pd.DataFrame, key: list, profile) -> list[np.ndarray]:
+        """
+        مواضع الصفوف التي تتكرر فيها قيمة المفتاح، مجموعة لكل قيمة (الصفوف ذات المفتاح الفارغ لا تُحسب).
+        التكرار يُكتشف من الـ hashes المحفوظة، ثم يُتأكد منه بمقارنة القيم الفعلية للصفوف المرشحة فقط.
+        """
+        hashes = profile.key_hashes(key)
+        positions = np.flatnonzero(~np.logical_or.reduce([profile[col].null_mask.to_numpy() for col in key]))
+        candidates = positions[pd.Series(hashes[positions]).duplicated(keep=False).to_numpy()]
+        if len(candidates):
+            candidates = candidates[df.iloc[candidates][key].duplicated(keep=False).to_numpy()]
+        if not len(candidates):
+            return []
+        codes, _ = pd.factorize(hashes[candidates])
+        order = np.argsort(codes, kind="stable")
+        return np.split(candidates[order], np.flatnonzero(np.diff(codes[order])) + 1)
 
 
 @register
 class InvalidValuesAnalyzer(BaseAnalyzer):
     def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
         issues = []
+        profile = frame_profile(df, kwargs)
         n_rows, _ = df.shape
         for c_idx, col in enumerate(df.columns):
-            if pd.api.types.is_numeric_dtype(df[col]):
+            if profile[col].is_numeric:
                 series = df[col]
                 neg = series < 0
                 if neg.any():
@@ -163,14 +291,31 @@ class InvalidValuesAnalyzer(BaseAnalyzer):
     
 @register
 class OutliersAnalyzer(BaseAnalyzer):
-    def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
+    """
+    outlier_method: "sigma" (افتراضي) أو "mad" أو "iqr" (outliers.py)، و outlier_k لتغيير المعامل.
+    outlier_group: عمود تُحسب الحدود داخل كل قيمة من قيمه على حدة (مثلاً السعر داخل كل فئة منتج).
+    """
+    def run(self, df: pd.DataFrame, outlier_method: str = None, outlier_k: float = None,
+            outlier_group: str = None, **kwargs) -> list[dict]:
         issues = []
+        profile = frame_profile(df, kwargs)
+        detector = get_detector(outlier_method, outlier_k)
+        group = outlier_group if outlier_group in df.columns else None
         n_rows, _ = df.shape
         for c_idx, col in enumerate(df.columns):
-            if pd.api.types.is_numeric_dtype(df[col]):
-                series = df[col].dropna()
-                mean, std = series.mean(), series.std()
-                mask = (series < mean - 3*std) | (series > mean + 3*std)
+            if profile[col].is_numeric and col != group:
+                series = profile[col].non_null
+                if pd.api.types.is_bool_dtype(series):
+                    series = series.astype("float64")
+                if group:
+                    keys = profile[group].strings[series.index]
+                    table = detector.group_bounds(series, keys)
+                    low, high = keys.map(table["low"]), keys.map(table["high"])
+                    details = f"outside {detector.label} within each '{group}' group"
+                else:
+                    low, high, center = detector.bounds(series)
+                    details = detector.describe(low, high, center)
+                mask = (series < low) | (series > high)
                 if mask.any():
                     rows = [cell_ref(i, c_idx) for i in series[mask].index]
                     issues.append({
@@ -178,8 +323,8 @@ class OutliersAnalyzer(BaseAnalyzer):
                         "issue": "Outliers",
                         "count": int(mask.sum()),
                         "pct": f"{int(mask.sum()/n_rows*100)}%",
-                        "details": f"outside ±3σ (mean={mean:.2f})",
-                        "rows": "-"
+                        "details": details,
+                        "rows": ", ".join(rows[:10]) + ("..." if len(rows) > 10 else "")
                     })
         return issues
 
@@ -188,19 +333,18 @@ class ColumnSimilarityAnalyzer(BaseAnalyzer):
     def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
         issues = []
         threshold = kwargs.get("similarity_threshold", 0.8)
+        profile = frame_profile(df, kwargs)
         n_rows, _ = df.shape
         for i, col1 in enumerate(df.columns):
             for j, col2 in enumerate(df.columns):
                 if i >= j:
                     continue 
-                series1 = df[col1].dropna()
-                series2 = df[col2].dropna()
+                series1 = profile[col1].non_null_strings
+                series2 = profile[col2].non_null_strings
                 min_len = min(len(series1), len(series2))
                 if min_len == 0:
                     continue
-                series1 = series1.iloc[:min_len].astype(str).reset_index(drop=True)
-                series2 = series2.iloc[:min_len].astype(str).reset_index(drop=True)
-                match_count = (series1 == series2).sum()
+                match_count = (series1.to_numpy()[:min_len] == series2.to_numpy()[:min_len]).sum()
                 similarity = match_count / min_len
                 if similarity >= threshold:
                     issues.append({
@@ -215,115 +359,187 @@ class ColumnSimilarityAnalyzer(BaseAnalyzer):
 
 @register
 class CrossFieldValueAnalyzer(BaseAnalyzer):
+    """
+    Rules are dicts evaluated once over whole columns:
+        {"column": "Price", "issue": "...", "when": "Quantity == 0 and Price != 0",
+         "details": "Price={Price}"}
+    "when" is a DataFrame.eval expression, a callable(df) -> boolean mask, or a mask.
+    "details" is a template formatted with the last offending row, or a callable(row).
+    Plain callables taking a single row are still accepted and applied row by row.
+    """
+    expected_currency = {
+        "egypt": "ج.م",
+        "usa": "$",
+        "uk": "£",
+        "ksa": "ر.س"
+    }
+    female_names = {"fatima", "sara", "laila", "eman", "nour"}
+
     def run(self, df: pd.DataFrame, rules: list = None, **kwargs) -> list[dict]:
-        from collections import defaultdict
-        issues_map = defaultdict(lambda: {
-            "count": 0,
-            "rows": [],
-            "details": "",
-            "pct": "",
-            "column": "",
-            "issue": ""
-        })
         n_rows, _ = df.shape
-        date_columns = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
         if rules is None:
-            rules = [
-                lambda row: self.rule_start_before_end(row, date_columns),
-                self.rule_zero_qty_price,
-                self.rule_country_currency,
-                self.rule_gender_name
-            ]
-        for i in range(n_rows):
-            row = df.iloc[i]
-
-            for rule in rules:
-                try:
-                    results = rule(row)
-                    for result in results:
-                        col_name = result.get("column", "—")
-                        issue_text = result.get("issue", "Cross-field Value Error")
-                        details = result.get("details", "")
-                        col_idx = df.columns.get_loc(col_name) if col_name in df.columns else None
-                        cell_ref = self.cell_ref(i, col_idx) if col_idx is not None else f"Row {i + 2}"
-
-                        key = (col_name, issue_text)
-                        issues_map[key]["column"] = col_name
-                        issues_map[key]["issue"] = issue_text
-                        issues_map[key]["details"] = details
-                        issues_map[key]["count"] += 1
-                        issues_map[key]["rows"].append(cell_ref)
-                except:
-                    continue
+            rules = self.default_rules(df)
+        issues_map = {}
+        for order, col_name, issue_text, positions, details in self.rule_hits(df, rules):
+            key = (col_name, issue_text)
+            entry = issues_map.setdefault(key, {
+                "column": col_name,
+                "issue": issue_text,
+                "positions": [],
+                "first": (positions[0], order),
+                "last": (positions[-1], order),
+                "details": details
+            })
+            entry["positions"].append(np.asarray(positions))
+            entry["first"] = min(entry["first"], (positions[0], order))
+            if (positions[-1], order) >= entry["last"]:
+                entry["last"] = (positions[-1], order)
+                entry["details"] = details
         issues = []
-        for issue in issues_map.values():
-            issue["pct"] = f"{int(100 * issue['count'] / n_rows)}%"
-            issue["rows"] = ", ".join(issue["rows"])
-            issues.append(issue)
+        for entry in sorted(issues_map.values(), key=lambda e: e["first"]):
+            col_name = entry["column"]
+            positions = np.sort(np.concatenate(entry["positions"]), kind="stable")
+            col_idx = df.columns.get_loc(col_name) if col_name in df.columns else None
+            rows = [
+                self.cell_ref(i, col_idx) if col_idx is not None else f"Row {i + 2}"
+                for i in positions
+            ]
+            issues.append({
+                "count": len(rows),
+                "rows": ", ".join(rows),
+                "details": entry["details"](entry["last"][0]),
+                "pct": f"{int(100 * len(rows) / n_rows)}%",
+                "column": col_name,
+                "issue": entry["issue"]
+            })
         return issues
     @staticmethod
     def cell_ref(row_idx: int, col_idx: int) -> str:
         col_letter = chr(65 + col_idx)
         return f"{col_letter}{row_idx + 2}"
 
-    def rule_start_before_end(self, row, date_columns):
-        if len(date_columns) >= 2:
+    def rule_hits(self, df: pd.DataFrame, rules: list):
+        """Yields (rule order, column, issue, positions, details) for every rule that matched rows of df."""
+        for order, rule in enumerate(rules):
+            try:
+                if callable(rule):
+                    hits = self.evaluate_row_rule(df, rule)
+                else:
+                    hits = self.evaluate_rule(df, rule)
+            except Exception:
+                continue
+            for col_name, issue_text, positions, details in hits:
+                if len(positions):
+                    yield order, col_name, issue_text, positions, details
+
+    def evaluate_rule(self, df: pd.DataFrame, rule: dict) -> list[tuple]:
+        when = rule.get("when")
+        if isinstance(when, str):
+            mask = df.eval(when)
+        elif callable(when):
+            mask = when(df)
+        else:
+            mask = when
+        mask = pd.Series(mask, index=df.index).fillna(False).astype(bool)
+        positions = np.flatnonzero(mask.to_numpy())
+        template = rule.get("details", "")
+
+        def details(pos):
+            row = df.iloc[pos]
+            if callable(template):
+                return template(row)
             try:
-                start = pd.to_datetime(row[date_columns[0]], errors='coerce')
-                end = pd.to_datetime(row[date_columns[1]], errors='coerce')
-                if pd.notnull(start) and pd.notnull(end) and start > end:
-                    return [{
-                        "column": date_columns[0],
-                        "issue": "Start date is after end date",
-                        "details": f"{date_columns[0]} > {date_columns[1]}"
-                    }]
-            except:
-                pass
-        return []
+                return template.format_map(row.to_dict())
+            except (KeyError, IndexError, ValueError):
+                return template
+        return [(
+            rule.get("column", "—"),
+            rule.get("issue", "Cross-field Value Error"),
+            positions,
+            details
+        )]
+
+    def evaluate_row_rule(self, df: pd.DataFrame, rule) -> list[tuple]:
+        found = {}
+        for i in range(len(df)):
+            try:
+                results = rule(df.iloc[i])
+            except Exception:
+                continue
+            for result in results:
+                key = (result.get("column", "—"), result.get("issue", "Cross-field Value Error"))
+                positions, details = found.setdefault(key, ([], {}))
+                positions.append(i)
+                details[i] = result.get("details", "")
+        return [
+            (col_name, issue_text, positions, details.get)
+            for (col_name, issue_text), (positions, details) in found.items()
+        ]
+
+    def default_rules(self, df: pd.DataFrame) -> list[dict]:
+        date_columns = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+        rules = []
+        if len(date_columns) >= 2:
+            start, end = date_columns[0], date_columns[1]
+            rules.append({
+                "column": start,
+                "issue": "Start date is after end date",
+                "when": lambda d: d[start] > d[end],
+                "details": lambda row: f"{start} > {end}"
+            })
+        rules += [
+            {
+                "column": "Price",
+                "issue": "Zero quantity with non-zero price",
+                "when": self.rule_zero_qty_price,
+                "details": lambda row: f"Quantity=0, Price={float(str(row['Price']).replace(',', ''))}"
+            },
+            {
+                "column": "Currency",
+                "issue": "Currency mismatch",
+                "when": self.rule_country_currency,
+                "details": self.details_country_currency
+            },
+            {
+                "column": "Gender",
+                "issue": "Male gender with female name",
+                "when": self.rule_gender_name,
+                "details": lambda row: (
+                    f"Name={str(row.get('Name', '')).strip().lower()}, "
+                    f"Gender={str(row.get('Gender', '')).strip().lower()}"
+                )
+            }
+        ]
+        return rules
     @staticmethod
-    def rule_zero_qty_price(row):
-        try:
-            qty = float(str(row["Quantity"]).replace(",", ""))
-            price = float(str(row["Price"]).replace(",", ""))
-            if qty == 0 and price != 0:
-                return [{
-                    "column": "Price",
-                    "issue": "Zero quantity with non-zero price",
-                    "details": f"Quantity=0, Price={price}"
-                }]
-        except:
-            pass
-        return []
+    def text_column(df: pd.DataFrame, col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[col].astype(str).str.strip().str.lower()
     @staticmethod
-    def rule_country_currency(row):
+    def rule_zero_qty_price(df: pd.DataFrame) -> pd.Series:
+        qty = pd.to_numeric(df["Quantity"].astype(str).str.replace(",", "").str.strip(), errors="coerce")
+        price_str = df["Price"].astype(str).str.replace(",", "").str.strip()
+        price = pd.to_numeric(price_str, errors="coerce")
+        # float("nan") parses, so a NaN price still counts as non-zero
+        price_parsed = price.notna() | price_str.str.lower().isin(["nan", "+nan", "-nan"])
+        return (qty == 0) & price_parsed & (price != 0)
+    def rule_country_currency(self, df: pd.DataFrame) -> pd.Series:
+        country = self.text_column(df, "Country")
+        currency = self.text_column(df, "Currency")
+        mask = pd.Series(False, index=df.index)
+        for name, symbol in self.expected_currency.items():
+            mask |= (country == name) & ~currency.str.contains(symbol.lower(), regex=False)
+        return mask
+    def details_country_currency(self, row: pd.Series) -> str:
         country = str(row.get("Country", "")).strip().lower()
         currency = str(row.get("Currency", "")).strip().lower()
-        expected_currency = {
-            "egypt": "ج.م",
-            "usa": "$",
-            "uk": "£",
-            "ksa": "ر.س"
-        }
-        if country in expected_currency:
-            if expected_currency[country].lower() not in currency:
-                return [{
-                    "column": "Currency",
-                    "issue": "Currency mismatch",
-                    "details": f"Expected {expected_currency[country]} for {country.title()}, got {currency}"
-                }]
-        return []
-    @staticmethod
-    def rule_gender_name(row):
-        name = str(row.get("Name", "")).strip().lower()
-        gender = str(row.get("Gender", "")).strip().lower()
-        female_names = {"fatima", "sara", "laila", "eman", "nour"}
-        if gender == "male" and any(fname in name for fname in female_names):
-            return [{
-                "column": "Gender",
-                "issue": "Male gender with female name",
-                "details": f"Name={name}, Gender={gender}"
-            }]
-        return []
+        return f"Expected {self.expected_currency[country]} for {country.title()}, got {currency}"
+    def rule_gender_name(self, df: pd.DataFrame) -> pd.Series:
+        name = self.text_column(df, "Name")
+        gender = self.text_column(df, "Gender")
+        pattern = "|".join(re.escape(fname) for fname in self.female_names)
+        return (gender == "male") & name.str.contains(pattern, regex=True)
 
 @register
 class MixedTypeAnalyzer(BaseAnalyzer):
@@ -331,17 +547,20 @@ class MixedTypeAnalyzer(BaseAnalyzer):
     percentage_pattern = re.compile(r'\d+(\.\d+)?\s*(%|٪)')
     unit_pattern = re.compile(r'\d+(\.\d+)?\s*(kg|g|mg|lb|m|cm|mm|km|ltr|ml)', re.IGNORECASE)
     boolean_values = {"true", "false", "yes", "no", "نعم", "لا"}
-    def detect_type(self, value: str) -> str:
+    # أرقام لا يمكن أن تُقرأ كتاريخ (السنة 4 أرقام، و6 أو 8 أرقام تُقرأ كتاريخ)
+    plain_number_pattern = r'-\d+(\.\d+)?|(\d{1,3}|\d{5}|\d{7}|\d{9,})(\.\d+)?'
+    @classmethod
+    def detect_type(cls, value: str) -> str:
         if pd.isna(value) or str(value).strip() == "":
             return "empty"
         val = str(value).strip().lower()
-        if val in self.boolean_values:
+        if val in cls.boolean_values:
             return "boolean"
-        if self.currency_pattern.search(val):
+        if cls.currency_pattern.search(val):
             return "currency"
-        if self.percentage_pattern.search(val):
+        if cls.percentage_pattern.search(val):
             return "percentage"
-        if self.unit_pattern.search(val):
+        if cls.unit_pattern.search(val):
             return "unit"
         try:
             pd.to_datetime(value, errors='raise')
@@ -354,20 +573,39 @@ class MixedTypeAnalyzer(BaseAnalyzer):
         except:
             pass
         return "text"
+    @classmethod
+    @lru_cache(maxsize=100_000)
+    def detect_type_cached(cls, value: str) -> str:
+        return cls.detect_type(value)
+    @classmethod
+    def classify_series(cls, series: pd.Series) -> np.ndarray:
+        """
+        نوع كل خلية كما في detect_type(str(value)) لكن يُحسب مرة لكل قيمة مميزة.
+        """
+        types = np.empty(len(series), dtype=object)
+        todo = np.ones(len(series), dtype=bool)
+        if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_bool_dtype(series):
+            known = series.notna().to_numpy()
+            types[known] = "date" if pd.api.types.is_datetime64_any_dtype(series) else "boolean"
+            todo = ~known
+        elif pd.api.types.is_numeric_dtype(series):
+            fast = series.fillna("").astype(str).str.fullmatch(cls.plain_number_pattern).to_numpy(dtype=bool)
+            types[fast] = "number"
+            todo = ~fast
+        if todo.any():
+            codes, uniques = pd.factorize(series[todo].fillna("").astype(str))
+            unique_types = np.array([cls.detect_type_cached(u) for u in uniques], dtype=object)
+            types[todo] = unique_types[codes]
+        return types
     def run(self, df: pd.DataFrame, clean: bool = False, **kwargs) -> dict | list[dict]:
         issues = []
         n_rows, _ = df.shape
         cleaned_df = df.copy()
         for c_idx, col in enumerate(df.columns):
-            series = df[col].fillna("").astype(str)
-            type_series = series.apply(self.detect_type)
-            type_counts = type_series.value_counts()
+            types = self.classify_series(df[col])
+            type_counts = pd.Series(types).value_counts()
             dominant_type = type_counts.idxmax()
-            mixed_rows = [
-                self.cell_ref(i, c_idx)
-                for i, t in enumerate(type_series)
-                if t != dominant_type
-            ]
+            mixed_rows = [self.cell_ref(i, c_idx) for i in np.flatnonzero(types != dominant_type)]
             if len(type_counts) > 1:
                 issues.append({
                     "column": col,
@@ -379,18 +617,11 @@ class MixedTypeAnalyzer(BaseAnalyzer):
                     "rows": ", ".join(mixed_rows)
                 })
                 if clean:
-                    cleaned_df[col] = [
-                        val if self.detect_type(val) == dominant_type else None
-                        for val in df[col]
-                    ]
+                    cleaned_df[col] = df[col].where(types == dominant_type, None)
             empty_count = type_counts.get("empty", 0)
             empty_pct = empty_count / n_rows
             if empty_pct > 0.8:
-                empty_rows = [
-                    self.cell_ref(i, c_idx)
-                    for i, t in enumerate(type_series)
-                    if t == "empty"
-                ]
+                empty_rows = [self.cell_ref(i, c_idx) for i in np.flatnonzero(types == "empty")]
                 issues.append({
                     "column": col,
                     "issue": "Mostly Empty Column",
@@ -442,8 +673,9 @@ class InvalidDateValuesAnalyzer(BaseAnalyzer):
     def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
         issues = []
         keywords = kwargs.get("keywords", ["خطأ", "غير معروف", "n/a", "unknown", "NULL", "null", "#", "N/A", "NaT", "nat", "NAT","?","؟","#DIV/0!", "#REF!", "#VALUE!", "#NAME?", "#NULL!", "#NUM!", "#N/A"])
+        profile = frame_profile(df, kwargs)
         for c_idx, col in enumerate(df.columns):
-            null_mask = df[col].isna()
+            null_mask = profile[col].null_mask
             if null_mask.any():
                 rows = [cell_ref(i, c_idx) for i in null_mask[null_mask].index]
                 issues.append({
@@ -454,7 +686,7 @@ class InvalidDateValuesAnalyzer(BaseAnalyzer):
                     "details": "Null values or Excel Error",
                     "rows": ", ".join(rows[:10]) + ("..." if len(rows) > 10 else "")
                 })
-            str_col = df[col].astype(str).str.lower()
+            str_col = profile[col].lowered
             keywords_lower = [kw.lower() for kw in keywords]
             keyword_mask = str_col.isin(keywords_lower)
             if keyword_mask.any():
@@ -484,6 +716,66 @@ class InvalidDateFormatAnalyzer(BaseAnalyzer):
     def cell_ref(row_idx: int, col_idx: int) -> str:
         col_letter = chr(65 + col_idx)
         return f"{col_letter}{row_idx + 2}"
+    @staticmethod
+    @lru_cache(maxsize=100_000)
+    def matches_any(value: str, formats: tuple) -> bool:
+        for fmt in formats:
+            try:
+                datetime.strptime(value, fmt)
+                return True
+            except ValueError:
+                continue
+        return False
+    @classmethod
+    def unmatched_values(cls, values: pd.Series, formats: tuple) -> list[str]:
+        """
+        القيم المميزة التي لا تطابق أي صيغة: كل صيغة تُجرب دفعة واحدة بـ pd.to_datetime على ما تبقى فقط،
+        ثم strptime لما بقي بعدها (يقبل تواريخ خارج مدى pandas مثل سنة 1500).
+        """
+        unmatched = pd.Series(pd.unique(values), dtype=object)
+        for fmt in formats:
+            if unmatched.empty:
+                break
+            try:
+                unmatched = unmatched[pd.to_datetime(unmatched, format=fmt, errors="coerce").isna().to_numpy()]
+            except ValueError:
+                continue
+        return [value for value in unmatched if not cls.matches_any(value, formats)]
+    @classmethod
+    def invalid_values(cls, values: pd.Series, formats: tuple, first) -> list[str]:
+        """القيم التي لا تطابق أي صيغة ولا يقرأها pd.to_datetime (first: أول قيمة في العمود كله)."""
+        invalid = cls.unmatched_values(values, formats)
+        if invalid:
+            # pd.to_datetime يستنتج الصيغة من أول قيمة في العمود، فتُوضع قبل القيم المتبقية
+            probe = pd.Series([first] + invalid, dtype=object)
+            parsed = pd.to_datetime(probe, errors="coerce", infer_datetime_format=False).iloc[1:]
+            invalid = [value for value, ok in zip(invalid, parsed.notna()) if not ok]
+        return invalid
+    @staticmethod
+    def clean_dates(stripped: pd.Series) -> pd.Series:
+        raw = stripped.str.replace(r"[^\w\s/:.\-]", "", regex=True).str.strip()
+        return raw[raw.str.strip().str.lower().isin(["", "nan", "nat", "none"]) == False]
+    @staticmethod
+    def date_columns(cols: list, column_types: dict = None, excel_file: str = None,
+                     sheet_name: str = None) -> dict[str, str]:
+        """نوع كل عمود ("date" أو "other"): من column_types، أو تنسيقات Excel، أو اسم العمود."""
+        col_types: dict[str, str] = {}
+        if column_types:
+            col_types = column_types.copy()
+        elif excel_file and sheet_name:
+            meta = load_xlsx_metadata(excel_file, sheet_name)
+            n_meta = len(meta["number_formats"])
+            for idx, col in enumerate(cols):
+                fmt = (meta["number_formats"][idx] if idx < n_meta else "General").lower()
+                dtype = meta["data_types"][idx] if idx < n_meta else "n"
+                if any(x in fmt for x in ["y", "m", "d"]) or dtype == "d":
+                    col_types[col] = "date"
+                else:
+                    col_types[col] = "other"
+        else:
+            for col in cols:
+                col_types[col] = "date" if "date" in col.lower() else "other"
+        return col_types
     def run(
         self,
         df: pd.DataFrame,
@@ -497,42 +789,15 @@ class InvalidDateFormatAnalyzer(BaseAnalyzer):
         n_rows = len(df)
         cols = list(df.columns)
         valid_formats = valid_formats or self.default_formats
-        col_types: dict[str, str] = {}
-        if column_types:
-            col_types = column_types.copy()
-        elif excel_file and sheet_name:
-            wb = load_workbook(excel_file, data_only=True)
-            ws = wb[sheet_name]
-            for idx, col in enumerate(cols, start=1):
-                cell = ws.cell(row=2, column=idx)
-                fmt = (cell.number_format or "").lower()
-                dtype = cell.data_type
-                if any(x in fmt for x in ["y", "m", "d"]) or dtype == "d":
-                    col_types[col] = "date"
-                else:
-                    col_types[col] = "other"
-        else:
-            for col in cols:
-                col_types[col] = "date" if "date" in col.lower() else "other"
+        profile = frame_profile(df, kwargs)
+        col_types = self.date_columns(cols, column_types, excel_file, sheet_name)
         for c_idx, col in enumerate(cols):
             if col_types.get(col) != "date":
                 continue
-            raw = df[col].astype(str).str.strip()
-            raw = raw.str.replace(r"[^\w\s/:.\-]", "", regex=True).str.strip()
-            raw = raw[raw.str.strip().str.lower().isin(["", "nan", "nat", "none"]) == False]
-            failed = pd.Series([True] * len(raw), index=raw.index)
-            parsed = pd.to_datetime(raw, errors="coerce", infer_datetime_format=False)
-            failed &= parsed.isna()
-            for idx in raw[failed].index:
-                val = raw.loc[idx]
-                for fmt in valid_formats:
-                    try:
-                        datetime.strptime(val, fmt)
-                        failed.loc[idx] = False
-                        break
-                    except ValueError:
-                        continue
-            final_failed = failed[failed].index
+            raw = self.clean_dates(profile[col].stripped)
+            values = pd.Series(pd.unique(raw), dtype=object)
+            invalid = self.invalid_values(values, tuple(valid_formats), values.iloc[0] if len(values) else None)
+            final_failed = raw.index[raw.isin(invalid)]
             if final_failed.any():
                 rows = [self.cell_ref(i, c_idx) for i in final_failed]
                 examples = [raw.loc[i] for i in final_failed[:3]]
@@ -552,31 +817,40 @@ class InvalidDateFormatAnalyzer(BaseAnalyzer):
         return issues
 @register
 class DecimalFormatAnalyzer(BaseAnalyzer):
+    valid_number_pattern = re.compile(r'^-?\d{1,3}(,\d{3})*(\.\d+)?$|^-?\d+(\.\d+)?$')
+    @staticmethod
+    @lru_cache(maxsize=100_000)
+    def is_date(value: str) -> bool:
+        try:
+            parse_datetime(value, fuzzy=False)
+            return True
+        except Exception:
+            return False
+    @classmethod
+    def suspicious_mask(cls, str_col: pd.Series) -> np.ndarray:
+        """
+        قيمة مشبوهة: فيها رقم، ولا تطابق صيغة رقم صحيحة بعد حذف المسافات، ولا يقرأها dateutil كتاريخ.
+        الفحص على القيم المميزة فقط، و dateutil يُستدعى فقط للقيم التي اجتازت الشرطين الأولين.
+        """
+        codes, uniques = pd.factorize(str_col)
+        clean = pd.Series(uniques, dtype=object).str.replace(" ", "", regex=False)
+        has_digit = clean.str.contains(r"\d", regex=True).to_numpy(dtype=bool)
+        # str.isdigit يقبل أرقامًا لا يطابقها \d (مثل ²)
+        other = ~has_digit & clean.str.contains(r"[^\x00-\x7f]", regex=True).to_numpy(dtype=bool)
+        has_digit[other] = [any(ch.isdigit() for ch in v) for v in clean[other]]
+        candidates = has_digit & ~clean.str.fullmatch(cls.valid_number_pattern).to_numpy(dtype=bool)
+        verdict = np.zeros(len(uniques), dtype=bool)
+        verdict[candidates] = [not cls.is_date(v) for v in uniques[candidates]]
+        return verdict[codes]
     def run(self, df: pd.DataFrame, **kwargs) -> list[dict]:
-        import re
-        from dateutil.parser import parse
         issues = []
-        valid_number_pattern = r'^-?\d{1,3}(,\d{3})*(\.\d+)?$|^-?\d+(\.\d+)?$'
+        profile = frame_profile(df, kwargs)
         for c_idx, col in enumerate(df.columns):
-            str_col = df[col].astype(str).str.strip()
-            suspicious = []
-
-            for i, val in str_col.items():
-                val_clean = val.replace(" ", "")
-                if val_clean == "":
-                    continue
-                try:
-                    parse(val, fuzzy=False)
-                    continue
-                except:
-                    pass
-                if any(char.isdigit() for char in val_clean):
-                    if re.fullmatch(valid_number_pattern, val_clean):
-                        continue 
-                    suspicious.append((i, val))
-            if suspicious:
-                rows = [self.cell_ref(i, c_idx) for i, _ in suspicious]
-                values = [v for _, v in suspicious]
+            str_col = profile[col].stripped
+            suspicious = str_col[self.suspicious_mask(str_col)]
+            if len(suspicious):
+                rows = [self.cell_ref(i, c_idx) for i in suspicious.index]
+                values = suspicious.tolist()
 
                 issues.append({
                     "column": col,
@@ -591,10 +865,20 @@ class DecimalFormatAnalyzer(BaseAnalyzer):
     def cell_ref(row_idx: int, col_idx: int) -> str:
         col_letter = chr(65 + col_idx)
         return f"{col_letter}{row_idx + 2}"
-def run_all(df: pd.DataFrame, **kwargs) -> list[dict]:
+def run_all(df: pd.DataFrame, hook=None, parse_dates: bool = False, **kwargs) -> list[dict]:
+    """
+    hook (اختياري): hook(name) يُرجع context manager يحيط بكل محلل (مثل Instrumentation.analyzer_hook).
+    parse_dates: تحويل أعمدة التواريخ النصية إلى datetime أولًا (detect_and_parse_dates).
+    ملخص الأعمدة (column_profile.py) يُبنى مرة واحدة هنا وتتشاركه كل المحللات.
+    """
+    if parse_dates:
+        with hook("detect_and_parse_dates") if hook else nullcontext():
+            df = detect_and_parse_dates(df)
+    kwargs["frame_profile"] = frame_profile(df, kwargs)
     results = []
     for Analyzer in ANALYZERS:
-        results.extend(Analyzer().run(df, **kwargs))
+        with hook(Analyzer.__name__) if hook else nullcontext():
+            results.extend(Analyzer().run(df, **kwargs))
     return results
 
 
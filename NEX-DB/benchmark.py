@@ -0,0 +1,239 @@
+# benchmark.py
+"""
+قياس أداء كل محلل مسجل (ANALYZERS / DB_ANALYZERS) والـ loaders وكاتب التقرير
+على بيانات صناعية بأحجام مختلفة، وحفظ النتائج في ملف JSON للمقارنة بين الإصدارات.
+
+    python benchmark.py --scales 1000,10000 --output bench.json
+    python benchmark.py --scales 1000,10000 --output new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import analyzers
+import db_analyzers
+import loaders
+import relationships
+from pushdown import run_pushdown
+from report import create_report
+from streaming import run_streaming
+
+KEYWORDS = ["N/A", "unknown", "NULL", "#REF!", "?"]
+# الـ lru_cache على مستوى الموديول؛ تُفرَّغ قبل كل تكرار حتى لا يُقاس تشغيل بذاكرة دافئة
+CACHED = [
+    analyzers.parse_date_text,
+    analyzers.MixedTypeAnalyzer.detect_type_cached,
+    analyzers.InvalidDateFormatAnalyzer.matches_any,
+    analyzers.DecimalFormatAnalyzer.is_date,
+]
+
+
+def make_dataset(rows: int, cols: int = 8, cardinality: int = 100, null_rate: float = 0.05,
+                 mixed_rate: float = 0.02, error_rate: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """
+    بيانات صناعية بعدد صفوف وأعمدة محدد، مع نسب تحكم للقيم الفارغة والأنواع المختلطة
+    والأخطاء المزروعة (قيم سالبة، قيم شاذة، كلمات غير مقبولة، تواريخ غير صالحة، صفوف مكررة).
+    """
+    rng = np.random.default_rng(seed)
+    data = {"id": np.arange(rows)}
+    kinds = ["int", "float", "category", "date", "mixed"]
+    for i in range(cols - 1):
+        kind = kinds[i % len(kinds)]
+        name = f"{kind}_{i}"
+        if kind == "int":
+            col = pd.Series(rng.integers(1, cardinality + 1, rows), dtype="float64")
+            col[rng.random(rows) < error_rate] *= -1
+        elif kind == "float":
+            col = pd.Series(rng.normal(100, 15, rows).round(2))
+            col[rng.random(rows) < error_rate] = 1e6
+        elif kind == "category":
+            col = pd.Series([f"value_{v}" for v in rng.integers(0, cardinality, rows)], dtype=object)
+            mask = rng.random(rows) < error_rate
+            col[mask] = rng.choice(KEYWORDS, int(mask.sum()))
+        elif kind == "date":
+            days = rng.integers(0, 3650, rows)
+            col = pd.Series((pd.Timestamp("2015-01-01") + pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d"),
+                            dtype=object)
+            col[rng.random(rows) < error_rate] = "2023-02-30"
+        else:
+            col = pd.Series(rng.integers(0, cardinality, rows).astype(str), dtype=object)
+            mask = rng.random(rows) < mixed_rate
+            col[mask] = rng.choice(["abc", "2020-01-01", "true", "1.5"], int(mask.sum()))
+        col[rng.random(rows) < null_rate] = None
+        data[name] = col
+    df = pd.DataFrame(data)
+    n_dup = int(rows * error_rate)
+    if n_dup:
+        df.iloc[rows - n_dup:] = df.iloc[:n_dup].to_numpy()
+    return df
+
+
+def timed(func, repeat: int = 1, setup=None) -> tuple[float, str]:
+    """
+    أفضل زمن من repeat مرات، ونص الخطأ إن فشلت الدالة.
+    setup (إن وُجد) يُستدعى قبل كل تكرار خارج التوقيت وتُمرَّر نتيجته إلى func.
+    """
+    best = None
+    for _ in range(repeat):
+        for cached in CACHED:
+            cached.cache_clear()
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, None
+
+
+def write_inputs(df: pd.DataFrame, folder: str, xlsx_max_rows: int) -> dict:
+    paths = {"csv": os.path.join(folder, "data.csv"), "db": os.path.join(folder, "data.db")}
+    df.to_csv(paths["csv"], index=False)
+    with sqlite3.connect(paths["db"]) as conn:
+        df.to_sql("data", conn, index=False)
+    if len(df) <= xlsx_max_rows:
+        paths["xlsx"] = os.path.join(folder, "data.xlsx")
+        df.to_excel(paths["xlsx"], index=False)
+    if loaders.pa is not None:
+        paths["parquet"] = os.path.join(folder, "data.parquet")
+        df.to_parquet(paths["parquet"], index=False)
+    return paths
+
+
+def run_scale(rows: int, repeat: int = 1, xlsx_max_rows: int = 20_000, **options) -> list[dict]:
+    results = []
+
+    def record(component, name, func, setup=None):
+        seconds, error = timed(func, repeat, setup)
+        results.append({"rows": rows, "component": component, "name": name,
+                        "seconds": round(seconds, 6), "error": error})
+
+    df = make_dataset(rows, **options)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_inputs(df, folder, xlsx_max_rows)
+
+        record("loaders", "load_csv", lambda: loaders.load_csv(paths["csv"]))
+        record("loaders", "load_sqlite", lambda: loaders.load_sqlite(paths["db"]))
+        if "xlsx" in paths:
+            record("loaders", "load_xlsx", lambda: loaders.load_xlsx(paths["xlsx"]))
+        if "parquet" in paths:
+            record("loaders", "load_columnar", lambda: loaders.load_columnar(paths["parquet"]))
+
+        frame, _ = loaders.load_csv(paths["csv"])
+        found = {}
+        for Analyzer in analyzers.ANALYZERS:
+            # بعض المحللات تعدّل الـ DataFrame، لذلك كل تكرار يأخذ نسخة جديدة خارج التوقيت
+            # وكل تكرار يستبدل نتيجة سابقه حتى لا تتضاعف المشاكل مع repeat
+            record("analyzers", Analyzer.__name__,
+                   lambda copy: found.__setitem__(Analyzer.__name__, Analyzer().run(copy)),
+                   setup=frame.copy)
+        issues = [issue for Analyzer in analyzers.ANALYZERS for issue in found.get(Analyzer.__name__, [])]
+
+        record("streaming", "run_streaming",
+               lambda: run_streaming(paths["csv"], chunksize=max(1_000, rows // 4)))
+
+        for Analyzer in db_analyzers.DB_ANALYZERS:
+            record("db_analyzers", Analyzer.__name__,
+                   lambda: Analyzer().run(paths["db"], profile="safe"))
+
+        def pushdown():
+            with db_analyzers.DBSession(paths["db"]) as session:
+                run_pushdown(session)
+        record("db_analyzers", "run_pushdown", pushdown)
+
+        half = frame.iloc[:, : max(2, frame.shape[1] // 2)]
+        file_dfs = {"a.csv": frame, "b.csv": half.rename(columns=lambda c: f"{c}_ref")}
+        record("relationships", "compute_relationships",
+               lambda: relationships.compute_relationships(file_dfs, ["a.csv"]))
+        record("relationships", "compute_value_relationships",
+               lambda: relationships.compute_value_relationships(file_dfs, ["a.csv"]))
+
+        report_path = os.path.join(folder, "report.xlsx")
+        time_stats = {"start": 0.0, "end": 0.0, "elapsed_s": 0.0}
+        record("report", "create_report",
+               lambda: create_report({"data.csv (csv)": issues}, time_stats, {"data.csv": "utf-8"},
+                                     {"data.csv": paths["csv"]}, report_path))
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(old: dict, new: dict, threshold: float = 1.2) -> list[dict]:
+    """الحالات التي أصبحت أبطأ من threshold مرة مقارنة بالتشغيل السابق."""
+    before = {(r["rows"], r["component"], r["name"]): r["seconds"] for r in old["results"] if not r["error"]}
+    regressions = []
+    for r in new["results"]:
+        key = (r["rows"], r["component"], r["name"])
+        if r["error"] or key not in before or not before[key]:
+            continue
+        ratio = r["seconds"] / before[key]
+        if ratio >= threshold:
+            regressions.append({**r, "before": before[key], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NEX-DB benchmark suite")
+    parser.add_argument("--scales", default="1000,10000,100000", help="comma-separated row counts")
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--cardinality", type=int, default=100)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--mixed-rate", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="previous benchmark JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    options = {"cols": args.cols, "cardinality": args.cardinality, "null_rate": args.null_rate,
+               "mixed_rate": args.mixed_rate, "error_rate": args.error_rate}
+    report = {"environment": environment(), "options": options, "results": []}
+    for rows in (int(s) for s in args.scales.split(",") if s.strip()):
+        for r in run_scale(rows, repeat=args.repeat, **options):
+            report["results"].append(r)
+            status = r["error"] or f"{r['seconds']:.4f}s"
+            print(f"{rows:>10} {r['component']:<14} {r['name']:<32} {status}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nNEX-DB ==> Benchmark saved at: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        regressions = compare(old, report, args.threshold)
+        for r in regressions:
+            print(f"⚠️ {r['component']}.{r['name']} @ {r['rows']} rows: "
+                  f"{r['before']:.4f}s -> {r['seconds']:.4f}s (x{r['ratio']})")
+        if not regressions:
+            print("NEX-DB ==> No regressions")
+
+
+if __name__ == "__main__":
+    main()
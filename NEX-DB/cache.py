@@ -0,0 +1,104 @@
+# cache.py
+"""
+ذاكرة نتائج دائمة (ملف SQLite في مجلد التقرير) حتى لا يُعاد تحليل الملفات التي لم تتغير.
+
+كل ملف يُعرَّف بالمسار + الحجم + وقت التعديل + hash المحتوى + إصدار المحللات.
+إذا تطابق الحجم ووقت التعديل تُستخدم النتيجة مباشرة، وإذا تغير وقت التعديل فقط
+يُحسب hash المحتوى، فإن لم يتغير تُستخدم النتيجة أيضًا.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+
+CACHE_NAME = ".nex_cache.sqlite"  # ليس .db حتى لا يُكتشف كقاعدة بيانات للتحليل
+ANALYZER_MODULES = ["loaders.py", "analyzers.py", "streaming.py", "db_analyzers.py", "pushdown.py", "pipeline.py",
+                    "column_profile.py", "sampling.py", "near_duplicates.py", "outliers.py"]
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def analyzer_version(**options) -> str:
+    """
+    hash لكود المحللات وخيارات التشغيل؛ أي تعديل في أحدهما يُبطل كل النتائج المحفوظة.
+    ملف workload يدخل بمحتواه لا بمساره فقط، فتعديل الاستعلامات يُبطل نتائج IndexAnalyzer.
+    """
+    digest = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ANALYZER_MODULES:
+        with open(os.path.join(here, name), "rb") as f:
+            digest.update(f.read())
+    digest.update(repr(sorted(options.items())).encode("utf-8"))
+    workload = options.get("workload")
+    if workload and os.path.isfile(workload):
+        digest.update(file_digest(workload).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_path: str, version: str):
+        self.version = version
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "digest TEXT, version TEXT, result BLOB)"
+        )
+        # الحالة وقت القراءة، حتى لا يُحفظ ملف تغيّر أثناء تحليله على أنه محدث
+        self._seen = {}
+
+    def get(self, path: str):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest, version, result FROM results WHERE path = ?", (path,)
+        ).fetchone()
+        current = None
+        if row is not None and row[3] == self.version and row[0] == stat.st_size:
+            size, mtime_ns, digest, _, blob = row
+            if mtime_ns == stat.st_mtime_ns:
+                return pickle.loads(blob)
+            current = file_digest(path)
+            if current == digest:
+                self.conn.execute("UPDATE results SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+                self.conn.commit()
+                return pickle.loads(blob)
+        # الملف سيُحلل: الحجم ووقت التعديل والـ hash تُؤخذ كلها الآن، قبل التحليل
+        self._seen[path] = (stat.st_size, stat.st_mtime_ns, current or file_digest(path))
+        return None
+
+    def put(self, path: str, result: dict) -> None:
+        path = os.path.abspath(path)
+        if path not in self._seen:
+            stat = os.stat(path)
+            self._seen[path] = (stat.st_size, stat.st_mtime_ns, file_digest(path))
+        size, mtime_ns, digest = self._seen.pop(path)
+        stored = {k: v for k, v in result.items() if k not in ("df", "sketches")}
+        stored["df"] = stored["sketches"] = None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, digest, self.version, pickle.dumps(stored))
+        )
+        self.conn.commit()
+
+    def prune(self, paths: list[str]) -> None:
+        """يحذف نتائج الملفات التي لم تعد موجودة في المجلد."""
+        keep = {os.path.abspath(path) for path in paths}
+        stale = [(p,) for (p,) in self.conn.execute("SELECT path FROM results") if p not in keep]
+        self.conn.executemany("DELETE FROM results WHERE path = ?", stale)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,89 @@
+# column_profile.py
+"""
+ملخص لكل عمود (قناع القيم الفارغة، القيم غير الفارغة، النص، الـ hashes، هل العمود رقمي)
+يُبنى مرة واحدة لكل DataFrame في run_all ويُمرَّر لكل المحللات كـ frame_profile،
+بدل أن يعيد كل محلل حساب isna() و astype(str) لنفس العمود.
+
+كل قيمة تُحسب عند أول طلب لها فقط ثم تُحفظ، فلا يُدفع ثمن ما لا يستخدمه أي محلل.
+"""
+from functools import cached_property
+import numpy as np
+import pandas as pd
+
+
+class ColumnProfile:
+    def __init__(self, series: pd.Series):
+        self.series = series
+
+    @cached_property
+    def null_mask(self) -> pd.Series:
+        return self.series.isna()
+
+    @cached_property
+    def null_count(self) -> int:
+        return int(self.null_mask.sum())
+
+    @cached_property
+    def non_null(self) -> pd.Series:
+        """مثل series.dropna() بنفس الـ index."""
+        return self.series[~self.null_mask]
+
+    @cached_property
+    def strings(self) -> pd.Series:
+        return self.series.astype(str)
+
+    @cached_property
+    def stripped(self) -> pd.Series:
+        return self.strings.str.strip()
+
+    @cached_property
+    def lowered(self) -> pd.Series:
+        return self.strings.str.lower()
+
+    @cached_property
+    def non_null_strings(self) -> pd.Series:
+        return self.non_null.astype(str)
+
+    @cached_property
+    def hashes(self) -> np.ndarray:
+        """hash بـ 64 bit لكل قيمة (pd.util.hash_pandas_object)؛ القيم المتساوية لها نفس الـ hash."""
+        return pd.util.hash_pandas_object(self.series, index=False).to_numpy()
+
+    @cached_property
+    def is_numeric(self) -> bool:
+        # مثل pd.api.types.is_numeric_dtype (يشمل bool) كما تستخدمه المحللات
+        return pd.api.types.is_numeric_dtype(self.series)
+
+
+class FrameProfile:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._columns: dict[str, ColumnProfile] = {}
+
+    def __getitem__(self, col) -> ColumnProfile:
+        if col not in self._columns:
+            self._columns[col] = ColumnProfile(self.df[col])
+        return self._columns[col]
+
+    def key_hashes(self, key: list) -> np.ndarray:
+        """hash مركّب لعدة أعمدة يُبنى من hashes الأعمدة المحفوظة بدون إعادة hash للـ DataFrame."""
+        combined = self[key[0]].hashes
+        for col in key[1:]:
+            combined = combined * np.uint64(0x100000001B3) ^ self[col].hashes
+        return combined
+
+    @cached_property
+    def full_missing(self) -> pd.Series:
+        """الصفوف الفارغة بالكامل، مثل df.isna().all(axis=1) لكن من أقنعة الأعمدة المحفوظة."""
+        if not len(self.df.columns) or not self.df.columns.is_unique:
+            return self.df.isna().all(axis=1)
+        mask = np.logical_and.reduce([self[col].null_mask.to_numpy() for col in self.df.columns])
+        return pd.Series(mask, index=self.df.index)
+
+
+def frame_profile(df: pd.DataFrame, kwargs: dict) -> FrameProfile:
+    """الملخص الممرَّر من run_all إن كان لنفس الـ DataFrame، وإلا ملخص جديد (تشغيل محلل منفرد)."""
+    profile = kwargs.get("frame_profile")
+    if profile is None or profile.df is not df:
+        profile = FrameProfile(df)
+    return profile
@@ -1,6 +1,14 @@
 # db_analyzers.py
+import os
+import re
 import sqlite3
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from urllib.request import pathname2url
+from pushdown import literal, quote, run_pushdown
+from utils import Instrumentation
 
 DB_ANALYZERS: list[type["BaseDBAnalyzer"]] = []
 
@@ -8,19 +16,116 @@ def register_db(cls: type["BaseDBAnalyzer"]) -> type["BaseDBAnalyzer"]:
     DB_ANALYZERS.append(cls)
     return cls
 
+class DBSession:
+    """
+    اتصال واحد للقراءة فقط (mode=ro) لكل قاعدة بيانات تتشاركه كل المحللات،
+    مع حفظ نتائج الاستعلامات المكلفة (integrity_check, sqlite_master) بعد أول تنفيذ.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._cache = {}
+
+    @staticmethod
+    def connect_readonly(db_path: str) -> sqlite3.Connection:
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        return sqlite3.connect(uri, uri=True, timeout=1)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self.connect_readonly(self.db_path)
+        return self._conn
+
+    def cached(self, key: str, sql: str) -> list[tuple]:
+        # الاستثناء نفسه يُحفظ أيضًا حتى يراه كل محلل يطلب نفس النتيجة
+        if key not in self._cache:
+            try:
+                self._cache[key] = (True, self.conn.execute(sql).fetchall())
+            except sqlite3.Error as e:
+                self._cache[key] = (False, e)
+        ok, value = self._cache[key]
+        if not ok:
+            raise value
+        return value
+
+    def integrity_check(self) -> list[tuple]:
+        return self.cached("integrity_check", "PRAGMA integrity_check;")
+
+    def quick_check(self) -> list[tuple]:
+        return self.cached("quick_check", "PRAGMA quick_check;")
+
+    def tables(self) -> list[tuple]:
+        return self.cached("tables", "SELECT name, sql FROM sqlite_master WHERE type='table';")
+
+    def pragma(self, name: str):
+        return self.cached(name, f"PRAGMA {name};")[0][0]
+
+    @contextmanager
+    def time_budget(self, seconds: float = None):
+        """يقطع أي استعلام يتجاوز الوقت المحدد (sqlite3.OperationalError: interrupted)."""
+        if not seconds:
+            yield
+            return
+        deadline = time.perf_counter() + seconds
+        self.conn.set_progress_handler(lambda: int(time.perf_counter() > deadline), 10_000)
+        try:
+            yield
+        finally:
+            self.conn.set_progress_handler(None, 0)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 class BaseDBAnalyzer(ABC):
     @abstractmethod
     def run(self, db_path: str, **kwargs) -> list[dict]:
         pass
 
+    @contextmanager
+    def open_session(self, db_path: str, kwargs: dict):
+        session = kwargs.get("session")
+        if session is not None:
+            yield session
+            return
+        with DBSession(db_path) as session:
+            yield session
+
+    @contextmanager
+    def open_connection(self, db_path: str, kwargs: dict):
+        """
+        اتصال خاص بالمحلل (للفحوص التي تغيّر حالة الاتصال: BEGIN/COMMIT، load_extension)
+        حتى لا تمس اتصال الجلسة المشترك.
+        profile="safe": للقراءة فقط (mode=ro). غير ذلك: اتصال عادي قابل للكتابة كما في السابق.
+        """
+        if kwargs.get("profile") == "safe":
+            conn = DBSession.connect_readonly(db_path)
+        else:
+            conn = sqlite3.connect(db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def query_budget(kwargs: dict):
+        return kwargs.get("query_budget_s", 2.0 if kwargs.get("profile") == "safe" else None)
+
 @register_db
 class ConnectionErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
         try:
-            conn = sqlite3.connect(db_path, timeout=1)
-            conn.execute("PRAGMA schema_version;")
-            conn.close()
+            with self.open_session(db_path, kwargs) as session:
+                session.conn.execute("PRAGMA schema_version;")
         except sqlite3.OperationalError as e:
             issues.append({"stage":"Connection","error":"ConnectionError",
                            "message":str(e),"context":db_path})
@@ -39,37 +144,34 @@ class SQLSyntaxAnalyzer(BaseDBAnalyzer):
     ]
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        for sql in kwargs.get("scripts", self.TEST_QUERIES):
-            try:
-                cur.execute(sql)
-            except sqlite3.OperationalError as e:
-                msg = str(e).lower()
-                if "syntax error" in msg: err="SyntaxError"
-                elif "no such table" in msg: err="MissingTableOrColumn"
-                elif "datatype mismatch" in msg: err="TypeError"
-                elif "aggregate" in msg: err="AggregationError"
-                else: err="OperationalError"
-                issues.append({"stage":"SQLSyntax","error":err,
-                               "message":str(e),"context":sql})
-        conn.close()
+        with self.open_session(db_path, kwargs) as session:
+            cur = session.conn.cursor()
+            for sql in kwargs.get("scripts", self.TEST_QUERIES):
+                try:
+                    with session.time_budget(self.query_budget(kwargs)):
+                        cur.execute(sql)
+                except sqlite3.OperationalError as e:
+                    msg = str(e).lower()
+                    if "syntax error" in msg: err="SyntaxError"
+                    elif "interrupted" in msg: err="QueryBudgetExceeded"
+                    elif "no such table" in msg: err="MissingTableOrColumn"
+                    elif "datatype mismatch" in msg: err="TypeError"
+                    elif "aggregate" in msg: err="AggregationError"
+                    else: err="OperationalError"
+                    issues.append({"stage":"SQLSyntax","error":err,
+                                   "message":str(e),"context":sql})
         return issues
 
 @register_db
 class ConstraintsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cur = conn.cursor()
-        cur.execute("PRAGMA quick_check;")
-        for row in cur.fetchall():
-            t = row[0] or ""
-            if "failed" in t.lower():
-                issues.append({"stage":"Constraints","error":"IntegrityCheckFailed",
-                               "message":t,"context":"PRAGMA quick_check"})
-        conn.close()
+        with self.open_session(db_path, kwargs) as session:
+            for row in session.quick_check():
+                t = row[0] or ""
+                if "failed" in t.lower():
+                    issues.append({"stage":"Constraints","error":"IntegrityCheckFailed",
+                                   "message":t,"context":"PRAGMA quick_check"})
         return issues
 
 @register_db
@@ -77,9 +179,8 @@ class OperationalErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
         try:
-            conn = sqlite3.connect(db_path)
-            conn.execute("PRAGMA integrity_check;")
-            conn.close()
+            with self.open_session(db_path, kwargs) as session:
+                session.integrity_check()
         except sqlite3.DatabaseError as e:
             msg = str(e).lower()
             if "disk i/o error" in msg: err="DiskIOError"
@@ -93,39 +194,35 @@ class OperationalErrorsAnalyzer(BaseDBAnalyzer):
 class StructuralErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        try:
-            cur.execute("PRAGMA integrity_check;")
-            for row in cur.fetchall():
-                m = row[0] or ""
-                if "malformed" in m.lower():
-                    issues.append({"stage":"Structural","error":"MalformedDatabase",
-                                   "message":m,"context":"PRAGMA integrity_check"})
-        except sqlite3.DatabaseError as e:
-            issues.append({"stage":"Structural","error":"IntegrityCheckError",
-                           "message":str(e),"context":"PRAGMA integrity_check"})
-        conn.close()
+        with self.open_session(db_path, kwargs) as session:
+            try:
+                for row in session.integrity_check():
+                    m = row[0] or ""
+                    if "malformed" in m.lower():
+                        issues.append({"stage":"Structural","error":"MalformedDatabase",
+                                       "message":m,"context":"PRAGMA integrity_check"})
+            except sqlite3.DatabaseError as e:
+                issues.append({"stage":"Structural","error":"IntegrityCheckError",
+                               "message":str(e),"context":"PRAGMA integrity_check"})
         return issues
 
 @register_db
 class TransactionErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        try:
+        with self.open_connection(db_path, kwargs) as conn:
             conn.execute("BEGIN;")
             try: conn.execute("BEGIN;")
             except sqlite3.OperationalError as e:
                 issues.append({"stage":"Transaction","error":"NestedTransactionError",
                                "message":str(e),"context":"BEGIN within BEGIN"})
-            try: conn.execute("VACUUM;")
-            except sqlite3.OperationalError as e:
-                issues.append({"stage":"Transaction","error":"VacuumInTransactionError",
-                               "message":str(e),"context":"VACUUM"})
+            # VACUUM يعيد كتابة الملف كله، لذلك لا يُجرب في الوضع الآمن
+            if kwargs.get("profile") != "safe":
+                try: conn.execute("VACUUM;")
+                except sqlite3.OperationalError as e:
+                    issues.append({"stage":"Transaction","error":"VacuumInTransactionError",
+                                   "message":str(e),"context":"VACUUM"})
             conn.execute("COMMIT;")
-        finally:
-            conn.close()
         return issues
 
 @register_db
@@ -136,37 +233,216 @@ class ComplexQueryErrorsAnalyzer(BaseDBAnalyzer):
     ]
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        for sql in kwargs.get("tests", self.TEST_COMPLEX):
-            try:
-                cur.execute(sql)
-                cur.fetchall()
-            except sqlite3.OperationalError as e:
-                issues.append({"stage":"ComplexQuery","error":"ComplexQueryError",
-                               "message":str(e),"context":sql})
-        conn.close()
+        budget = self.query_budget(kwargs)
+        with self.open_session(db_path, kwargs) as session:
+            cur = session.conn.cursor()
+            for sql in kwargs.get("tests", self.TEST_COMPLEX):
+                try:
+                    with session.time_budget(budget):
+                        cur.execute(sql)
+                        # الصفوف تُقرأ على دفعات وتُهمل بدل تحميلها كلها في الذاكرة
+                        while cur.fetchmany(10_000):
+                            pass
+                except sqlite3.OperationalError as e:
+                    if "interrupted" in str(e).lower():
+                        issues.append({"stage":"ComplexQuery","error":"QueryBudgetExceeded",
+                                       "message":f"probe stopped after {budget}s","context":sql})
+                    else:
+                        issues.append({"stage":"ComplexQuery","error":"ComplexQueryError",
+                                       "message":str(e),"context":sql})
         return issues
 
 @register_db
 class IndexAnalyzer(BaseDBAnalyzer):
+    """
+    يشغّل EXPLAIN QUERY PLAN على استعلامات العمل الفعلية (workload: ملف .sql أو قائمة استعلامات)،
+    أو على استعلامات البحث بالمفاتيح الأجنبية المستخرجة من المخطط إن لم يُحدد workload،
+    ويقترح فهرسًا (covering إن أمكن) لكل مسح كامل لجدول كبير مع تقدير عدد الصفوف الموفرة.
+    """
+    SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\S+)(?: AS (\S+))?(.*)$')
+    IDENT_RE = re.compile(r'"((?:[^"]|"")+)"|`([^`]+)`|\[([^\]]+)\]|([A-Za-z_][\w$]*)')
+    # النصوص والمعرّفات المقتبسة والتعليقات تُتخطى، والمجموعة الأولى هي المعامل (?، ?NNN، :name، @name، $name)
+    PARAM_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)"
+                          r"|(\?\d*|[:@$][A-Za-z_]\w*)", re.DOTALL)
+    SAMPLE_ROWS = 10_000
+    # بدون إحصاءات تفترض SQLite أن شرط المدى يُبقي ربع الصفوف تقريبًا
+    RANGE_SELECTIVITY = 4
+
+    @staticmethod
+    def load_workload(workload) -> list[str]:
+        if isinstance(workload, str):
+            with open(workload, encoding="utf-8") as f:
+                text = f.read()
+            statements, current = [], ""
+            for line in text.splitlines(keepends=True):
+                current += line
+                if sqlite3.complete_statement(current):
+                    statements.append(current.strip())
+                    current = ""
+            if current.strip():
+                statements.append(current.strip())
+            return statements
+        return list(workload)
+
+    @classmethod
+    def parameters(cls, sql: str):
+        """قيم NULL لكل معاملات الاستعلام حتى يمكن تشغيل EXPLAIN عليه (tuple، أو dict للمعاملات المسماة)."""
+        count, names = 0, {}
+        for match in cls.PARAM_RE.finditer(sql):
+            param = match.group(1)
+            if not param:
+                continue
+            if param[0] != "?":
+                names[param[1:]] = None
+            elif param[1:]:
+                count = max(count, int(param[1:]))
+            else:
+                count += 1
+        return names if names else (None,) * count
+
+    @staticmethod
+    def foreign_key_queries(session: DBSession) -> list[str]:
+        # البحث عن الأبناء بقيمة المفتاح الأجنبي (يحدث أيضًا مع كل حذف/تعديل في الجدول الأب)
+        queries = []
+        for tbl, _ in session.tables():
+            fks = {}
+            for row in session.conn.execute(f"PRAGMA foreign_key_list({quote(tbl)});"):
+                fks.setdefault(row[0], []).append(row[3])
+            for cols in fks.values():
+                where = " AND ".join(f"{quote(col)} = ?" for col in cols)
+                queries.append(f"SELECT * FROM {quote(tbl)} WHERE {where};")
+        return queries
+
+    @staticmethod
+    def aliases(sql: str, tables: set) -> dict:
+        # خطة التنفيذ تذكر الاسم المستعار (SCAN x) بدل اسم الجدول
+        names = {tbl: tbl for tbl in tables}
+        for tbl in tables:
+            pattern = rf'(?:^|[\s,(]){re.escape(tbl)}["`\]]?\s+(?:AS\s+)?["`\[]?(\w+)'
+            for m in re.finditer(pattern, sql, flags=re.IGNORECASE):
+                names.setdefault(m.group(1), tbl)
+        return names
+
+    @staticmethod
+    def table_rows(session: DBSession, tbl: str) -> int:
+        # sqlite_stat1 إن وُجد (ANALYZE)، ثم MAX(rowid) كتقدير سريع، ثم العد الكامل
+        estimates = (f"SELECT stat FROM sqlite_stat1 WHERE tbl = {literal(tbl)} AND stat IS NOT NULL LIMIT 1;",
+                     f"SELECT MAX(rowid) FROM {quote(tbl)};",
+                     f"SELECT COUNT(*) FROM {quote(tbl)};")
+        for i, sql in enumerate(estimates):
+            try:
+                rows = session.cached(f"rows{i}:{tbl}", sql)
+            except sqlite3.Error:
+                continue
+            if rows and rows[0][0] is not None:
+                return int(str(rows[0][0]).split()[0])
+        return 0
+
+    @classmethod
+    def mentioned(cls, text: str, columns: list[str]) -> list[str]:
+        lookup = {col.lower(): col for col in columns}
+        found = []
+        for match in cls.IDENT_RE.finditer(text):
+            name = next(g for g in match.groups() if g is not None).replace('""', '"')
+            col = lookup.get(name.lower())
+            if col and col not in found:
+                found.append(col)
+        return found
+
+    @classmethod
+    def recommend(cls, session: DBSession, sql: str, tbl: str) -> tuple[list[str], int, bool]:
+        columns = [row[1] for row in session.conn.execute(f"PRAGMA table_info({quote(tbl)});")]
+        parts = re.split(r'\b(?:WHERE|ON|ORDER\s+BY|GROUP\s+BY)\b', sql, maxsplit=1, flags=re.IGNORECASE)
+        if len(parts) < 2:
+            return [], 0, False
+        head, predicate = parts
+        predicate_cols = cls.mentioned(predicate, columns)
+        # أعمدة المساواة أولًا ثم أعمدة المدى والترتيب
+        equality = [col for col in predicate_cols
+                    if re.search(rf'{re.escape(col)}["`\]]?\s*(?:=|IN\b|IS\b)', predicate, re.IGNORECASE)]
+        key = equality + [col for col in predicate_cols if col not in equality]
+        select_list = re.sub(r'^\s*SELECT\s+(?:DISTINCT\s+)?', "", re.split(r'\bFROM\b', head, flags=re.IGNORECASE)[0], flags=re.IGNORECASE)
+        if not key or "*" in select_list:
+            return key, len(equality), False
+        extra = [col for col in cls.mentioned(select_list, columns) if col not in key]
+        return key + extra, len(equality), True
+
+    @classmethod
+    def rows_per_key(cls, session: DBSession, tbl: str, cols: list[str]) -> float:
+        # متوسط الصفوف لكل قيمة من المفتاح المركب كاملًا (القيم التي فيها NULL لا تطابق بالمساواة)
+        names = ", ".join(quote(col) for col in cols)
+        not_null = " AND ".join(f"{quote(col)} IS NOT NULL" for col in cols)
+        sql = (f"WITH sample AS (SELECT {names} FROM {quote(tbl)} LIMIT {cls.SAMPLE_ROWS}) "
+               f"SELECT (SELECT COUNT(*) FROM sample), "
+               f"(SELECT COUNT(*) FROM (SELECT DISTINCT {names} FROM sample WHERE {not_null}));")
+        total, distinct = session.cached(f"distinct:{tbl}.{','.join(cols)}", sql)[0]
+        return total / distinct if distinct else float(total)
+
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute("EXPLAIN QUERY PLAN SELECT * FROM sqlite_master WHERE type='table';")
-        for row in cur.fetchall():
-            d = " ".join(str(x) for x in row)
-            if "SCAN TABLE" in d and "USING INDEX" not in d:
-                issues.append({"stage":"Index","error":"UnindexedQuery",
-                               "message":d,"context":"sqlite_master query"})
-        conn.close()
+        min_rows = kwargs.get("large_table_rows", 10_000)
+        with self.open_session(db_path, kwargs) as session:
+            tables = {tbl for tbl, _ in session.tables()}
+            workload = kwargs.get("workload")
+            queries = self.load_workload(workload) if workload else self.foreign_key_queries(session)
+            for sql in queries:
+                try:
+                    with session.time_budget(self.query_budget(kwargs)):
+                        plan = session.conn.execute("EXPLAIN QUERY PLAN " + sql, self.parameters(sql)).fetchall()
+                except (sqlite3.Error, ValueError) as e:
+                    issues.append({"stage":"Index","error":"PlanError",
+                                   "message":str(e),"context":sql})
+                    continue
+                names = self.aliases(sql, tables)
+                for row in plan:
+                    detail = row[-1]
+                    automatic = "AUTOMATIC" in detail
+                    m = self.SCAN_RE.match(detail)
+                    if m and "USING" in m.group(3):
+                        continue
+                    if not m and not automatic:
+                        continue
+                    tbl = names.get(m.group(1) if m else detail.split()[1])
+                    if tbl is None:
+                        continue
+                    n_rows = self.table_rows(session, tbl)
+                    if n_rows < min_rows and not automatic:
+                        continue
+                    issues.append({"stage":"Index","error":"AutomaticIndex" if automatic else "FullTableScan",
+                                   "message":f"{detail} (~{n_rows} rows)","context":sql})
+                    key, n_equal, covering = self.recommend(session, sql, tbl)
+                    if not key:
+                        continue
+                    try:
+                        per_key = self.rows_per_key(session, tbl, key[:n_equal]) if n_equal else n_rows / self.RANGE_SELECTIVITY
+                    except sqlite3.Error:
+                        per_key = float(n_rows)
+                    saved = max(0, n_rows - int(per_key))
+                    kind = "covering index" if covering else "index"
+                    index_sql = (f"CREATE INDEX {quote('idx_' + tbl + '_' + '_'.join(key))} "
+                                 f"ON {quote(tbl)}({', '.join(quote(col) for col in key)});")
+                    issues.append({"stage":"Index","error":"MissingIndex",
+                                   "message":f"{kind}: {index_sql} reads ~{int(per_key)} rows instead of "
+                                             f"{n_rows} (saves ~{saved} rows per query)",
+                                   "context":sql})
         return issues
 
 @register_db
 class MaintenanceErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
+        if kwargs.get("profile") == "safe":
+            # تقدير ما سيوفره VACUUM من عدد الصفحات الفارغة بدل تشغيله
+            with self.open_session(db_path, kwargs) as session:
+                page_count = session.pragma("page_count")
+                freelist = session.pragma("freelist_count")
+                page_size = session.pragma("page_size")
+            if page_count and freelist / page_count >= kwargs.get("freelist_threshold", 0.2):
+                issues.append({"stage":"Maintenance","error":"VacuumRecommended",
+                               "message":f"{freelist} of {page_count} pages are free "
+                                         f"(~{freelist * page_size / 1024 ** 2:.1f} MB reclaimable)",
+                               "context":"PRAGMA freelist_count"})
+            return issues
         conn = sqlite3.connect(db_path)
         try:
             conn.execute("VACUUM;")
@@ -180,35 +456,87 @@ class MaintenanceErrorsAnalyzer(BaseDBAnalyzer):
 class ExtensionErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        try:
-            conn.enable_load_extension(True)
-            conn.load_extension("nonexistent_extension")
-        except sqlite3.OperationalError as e:
-            issues.append({"stage":"Extension","error":"LoadExtensionError",
-                           "message":str(e),"context":"load_extension()"})
-        finally:
-            conn.close()
+        with self.open_connection(db_path, kwargs) as conn:
+            # بعض نسخ Python تُبنى بدون دعم تحميل الإضافات
+            if not hasattr(conn, "enable_load_extension"):
+                return issues
+            try:
+                conn.enable_load_extension(True)
+                conn.load_extension("nonexistent_extension")
+            except sqlite3.OperationalError as e:
+                issues.append({"stage":"Extension","error":"LoadExtensionError",
+                               "message":str(e),"context":"load_extension()"})
+            finally:
+                conn.enable_load_extension(False)
         return issues
 
 @register_db
 class DesignLogicErrorsAnalyzer(BaseDBAnalyzer):
     def run(self, db_path: str, **kwargs) -> list[dict]:
         issues = []
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT name, sql FROM sqlite_master WHERE type='table';")
-        for tbl, sql in cur.fetchall():
-            if "PRIMARY KEY" not in sql.upper():
-                issues.append({"stage":"DesignLogic","error":"MissingPrimaryKey",
-                               "message":f"table `{tbl}` has no PRIMARY KEY",
-                               "context":tbl})
-        conn.close()
+        with self.open_session(db_path, kwargs) as session:
+            for tbl, sql in session.tables():
+                if "PRIMARY KEY" not in sql.upper():
+                    issues.append({"stage":"DesignLogic","error":"MissingPrimaryKey",
+                                   "message":f"table `{tbl}` has no PRIMARY KEY",
+                                   "context":tbl})
         return issues
 
 
-def run_all_db(db_path: str, **kwargs) -> list[dict]:
+def run_all_db(db_path: str, timings: dict = None, table_issues: dict = None, hook=None, **kwargs) -> list[dict]:
+    """
+    profile="safe" يفتح القاعدة للقراءة فقط، لا يشغّل VACUUM، ويحدد وقتًا لكل استعلام اختبار.
+    timings (اختياري) يُملأ بمدة كل محلل بالثواني.
+    table_issues (اختياري) يُملأ بفحوص محتوى الجداول داخل SQLite (pushdown.py).
+    hook (اختياري): hook(name) يُرجع context manager يحيط بكل محلل، كما في analyzers.run_all.
+    """
     results = []
-    for Analyzer in DB_ANALYZERS:
-        results.extend(Analyzer().run(db_path, **kwargs))
+    with DBSession(db_path) as session:
+        for Analyzer in DB_ANALYZERS:
+            start = time.perf_counter()
+            with hook(Analyzer.__name__) if hook else nullcontext():
+                results.extend(Analyzer().run(db_path, session=session, **kwargs))
+            if timings is not None:
+                timings[Analyzer.__name__] = time.perf_counter() - start
+        if table_issues is not None:
+            start = time.perf_counter()
+            with hook("TablePushdown") if hook else nullcontext():
+                table_issues.update(run_pushdown(session, **kwargs))
+            if timings is not None:
+                timings["TablePushdown"] = time.perf_counter() - start
     return results
+
+
+def run_all_db_many(db_paths: list[str], workers: int = 8, timings: dict = None,
+                    tables: dict = None, perf: dict = None, trace_memory: bool = False,
+                    **kwargs) -> list[list[dict]]:
+    """
+    يحلل عدة قواعد بيانات في نفس الوقت (thread لكل قاعدة، sqlite3 يحرر الـ GIL أثناء الاستعلام).
+    النتائج بنفس ترتيب db_paths، وفشل قاعدة واحدة يُسجَّل كخطأ لها فقط.
+    timings (اختياري) يُملأ بـ {path: {analyzer: seconds}}، و tables بـ {path: {"(table)": issues}}.
+    perf (اختياري) يُملأ بـ {path: records} من Instrumentation (trace_memory يعمل فقط بدون threads).
+    """
+    parallel = workers > 1 and len(db_paths) > 1
+
+    def analyze(path):
+        db_timings = {}
+        if timings is not None:
+            timings[path] = db_timings
+        table_issues = None
+        if tables is not None:
+            table_issues = tables[path] = {}
+        hook = None
+        if perf is not None:
+            instrumentation = Instrumentation(os.path.basename(path), memory=trace_memory and not parallel)
+            perf[path] = instrumentation.records
+            hook = instrumentation.analyzer_hook
+        try:
+            return run_all_db(path, timings=db_timings, table_issues=table_issues, hook=hook, **kwargs)
+        except Exception as e:
+            return [{"stage":"Session","error":type(e).__name__,
+                     "message":str(e),"context":path}]
+
+    if not parallel:
+        return [analyze(path) for path in db_paths]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze, db_paths))
@@ -1,13 +1,25 @@
 # loaders.py
 import os
+import codecs
 import pandas as pd
 import sqlite3
 import chardet
+from contextlib import contextmanager
+from openpyxl import load_workbook
 
-SUPPORTED_EXTS = {'.csv', '.xlsx', '.db', '.sqlite3'}
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow في requirements.txt، لكن بدونه تبقى CSV/Excel/SQLite تعمل ويُرفض Parquet/Feather/Arrow فقط
+    pa = None
+
+COLUMNAR_EXTS = {'.parquet', '.feather', '.arrow', '.ipc'}
+SUPPORTED_EXTS = {'.csv', '.xlsx', '.db', '.sqlite3'} | COLUMNAR_EXTS
 
 def discover_files(folder_path):
-    """يبحث في المجلد عن الملفات المدعومة (.csv, .xlsx, .db, .sqlite3)."""
+    """يبحث في المجلد عن الملفات المدعومة (.csv, .xlsx, .db, .sqlite3, .parquet, .feather, .arrow)."""
     files = []
     for root, _, filenames in os.walk(folder_path):
         for fn in filenames:
@@ -16,49 +28,261 @@ def discover_files(folder_path):
                 files.append(os.path.join(root, fn))
     return files
 
-def load_csv(path):
+ENCODING_CANDIDATES = [
+    'utf-8',
+    'utf-8-sig',
+    'cp1252',
+    'cp1256',
+    'latin1',
+    'iso-8859-1',
+    'ascii'
+]
+SAMPLE_BYTES = 20_000
+SLICE_BYTES = 1_000_000
+
+# path -> (size, mtime, encoding)
+_encoding_cache: dict = {}
+
+def _decodes(raw, enc, at_start, at_end):
+    """يتحقق أن شريحة من الملف تُفك بالترميز بدون أخطاء."""
+    if not at_start and enc.startswith('utf'):
+        # الشريحة قد تبدأ في منتصف حرف متعدد البايتات
+        i = 0
+        while i < min(3, len(raw)) and 0x80 <= raw[i] <= 0xBF:
+            i += 1
+        raw = raw[i:]
+    try:
+        decoder = codecs.getincrementaldecoder(enc)(errors='strict')
+        decoder.decode(raw, final=at_end)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+def resolve_encoding(path):
     """
-    يحاول قراءة ملف CSV بعدة ترميزات شائعة.
-    يُرجع: DataFrame و الترميز المستخدم.
+    يحدد ترميز ملف CSV مرة واحدة: chardet على عينة صغيرة، ثم التحقق من المرشح
+    بفك شرائح أكبر (البداية والمنتصف والنهاية) بدل قراءة الملف كله لكل ترميز.
+    النتيجة تُحفظ لكل مسار حسب الحجم وتاريخ التعديل.
     """
-    # 1. اقرأ بعض البايتات لتحديد الترميز
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = _encoding_cache.get(key)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    size = stat.st_size
+    offsets = sorted({0, max(0, (size - SLICE_BYTES) // 2), max(0, size - SLICE_BYTES)})
+    slices = []
     with open(path, 'rb') as f:
-        raw = f.read(20_000)   # قراءة أول 10 كيلوبايت فقط للتسريع
-    detected = chardet.detect(raw).get('encoding')
-
-    # 2. قائمة الترميزات التي سنجربها
-    candidates = [
-        detected,
-        'utf-8',
-        'utf-8-sig',
-        'cp1252',
-        'cp1256',
-        'latin1',
-        'iso-8859-1',
-        'ascii'
-    ]
-
-    # 3. جرب كل ترميز حتى ينجح
-    for enc in candidates:
-        if not enc:
+        for off in offsets:
+            f.seek(off)
+            slices.append((off, f.read(SLICE_BYTES)))
+    detected = chardet.detect(slices[0][1][:SAMPLE_BYTES]).get('encoding')
+
+    encoding = None
+    for enc in [detected] + ENCODING_CANDIDATES:
+        # شرائح ASCII لا تثبت أن باقي الملف ASCII، و utf-8 يقبل نفس البايتات
+        if not enc or _is_ascii(enc):
             continue
+        if all(_decodes(raw, enc, off == 0, off + len(raw) >= size) for off, raw in slices):
+            encoding = enc
+            break
+
+    _encoding_cache[key] = (stat.st_size, stat.st_mtime_ns, encoding)
+    return encoding
+
+def _is_ascii(enc):
+    try:
+        return codecs.lookup(enc).name == 'ascii'
+    except LookupError:
+        return False
+
+def _remember_encoding(path, enc):
+    """يحفظ الترميز الذي نجحت به القراءة الكاملة بدل ما اختير من الشرائح."""
+    stat = os.stat(path)
+    _encoding_cache[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns, enc)
+
+def encoding_candidates(path, encoding=None):
+    """الترميز المحدد (أو resolve_encoding) أولًا، ثم باقي ENCODING_CANDIDATES بالترتيب."""
+    first = encoding or resolve_encoding(path)
+    candidates = [first] if first else []
+    for enc in ENCODING_CANDIDATES:
+        if enc not in candidates:
+            candidates.append(enc)
+    return candidates
+
+def load_csv(path, usecols=None):
+    """
+    يقرأ ملف CSV بالترميز المحدد من عينة (resolve_encoding)، وإن فشلت القراءة الكاملة
+    (بايتات غير صالحة خارج الشرائح التي تم فحصها) يجرب باقي الترميزات بالترتيب.
+    usecols: قراءة أعمدة محددة فقط.
+    يُرجع: DataFrame و الترميز المستخدم.
+    """
+    for enc in encoding_candidates(path):
         try:
-            df = pd.read_csv(path, encoding=enc)
-            print(f"🔍 Loaded CSV with encoding: {enc}")
-            
-            return df, enc
-        except Exception:
+            df = pd.read_csv(path, encoding=enc, usecols=usecols)
+        except UnicodeError:
             continue
+        _remember_encoding(path, enc)
+        print(f"🔍 Loaded CSV with encoding: {enc}")
+        return df, enc
 
-    # 4. حل أخير: قراءة بـ utf-8 وتجاهل/استبدال الأخطاء
+    # حل أخير: قراءة بـ utf-8 واستبدال الحروف غير الصالحة
     print("All encodings failed, using utf-8 with replacement of invalid chars")
-    df = pd.read_csv(path, encoding='utf-8', errors='replace')
+    df = pd.read_csv(path, encoding='utf-8', encoding_errors='replace', usecols=usecols)
     return df, 'utf-8 (fallback)'
 
+class CSVChunks:
+    """
+    دفعات ملف CSV بنفس تسلسل الترميزات في load_csv: إن فشل فك بايتات في منتصف الملف
+    تُعاد القراءة بالترميز التالي ويُتخطى ما سبق إرساله من صفوف، فلا تفشل القراءة كلها.
+    encoding: الترميز الحالي، ويُقرأ بعد انتهاء الدفعات لمعرفة الترميز الذي اكتملت به.
+    """
+    def __init__(self, path, chunksize, encoding=None):
+        self.path = path
+        self.chunksize = chunksize
+        self.candidates = encoding_candidates(path, encoding)
+        self.encoding = self.candidates[0]
+
+    def __iter__(self):
+        done = 0
+        for enc in self.candidates:
+            self.encoding = enc
+            try:
+                yield from self._read(enc, 'strict', done)
+            except UnicodeError:
+                done = self._done
+                continue
+            _remember_encoding(self.path, enc)
+            return
+        self.encoding = 'utf-8 (fallback)'
+        yield from self._read('utf-8', 'replace', done)
+
+    def _read(self, encoding, errors, skip):
+        self._done = skip
+        with pd.read_csv(self.path, encoding=encoding, encoding_errors=errors,
+                         chunksize=self.chunksize) as reader:
+            for chunk in reader:
+                if skip:
+                    # صفوف أُرسلت قبل إعادة القراءة بترميز آخر
+                    drop = min(skip, len(chunk))
+                    chunk, skip = chunk.iloc[drop:], skip - drop
+                    if chunk.empty:
+                        continue
+                yield chunk
+                self._done += len(chunk)
+
+def load_csv_chunks(path, chunksize=100_000, encoding=None):
+    """
+    يقرأ ملف CSV على دفعات بدل تحميله كاملًا في الذاكرة (CSVChunks).
+    يُرجع: الدفعات (DataFrame لكل دفعة) و الترميز المبدئي؛ الترميز النهائي في chunks.encoding.
+    """
+    chunks = CSVChunks(path, chunksize, encoding)
+    return chunks, chunks.encoding
+
 def load_xlsx(path):
     """يقرأ ملفات Excel."""
     return pd.read_excel(path, engine='openpyxl')
 
+# (path, sheet) -> (size, mtime, metadata)
+_xlsx_meta_cache: dict = {}
+
+def load_xlsx_metadata(path, sheet_name=None):
+    """
+    يقرأ صف العناوين وأول صف بيانات فقط (read_only) لمعرفة تنسيق كل عمود.
+    يُرجع: dict فيه headers و number_formats و data_types لكل عمود بالترتيب.
+    النتيجة تُحفظ لكل مسار وورقة حسب الحجم وتاريخ التعديل.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), sheet_name)
+    cached = _xlsx_meta_cache.get(key)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb[wb.sheetnames[0]]
+        rows = list(ws.iter_rows(min_row=1, max_row=2))
+    finally:
+        wb.close()
+    header = rows[0] if rows else ()
+    first = rows[1] if len(rows) > 1 else ()
+    n_cols = max(len(header), len(first))
+    meta = {"headers": [], "number_formats": [], "data_types": []}
+    for idx in range(n_cols):
+        cell = first[idx] if idx < len(first) else None
+        meta["headers"].append(header[idx].value if idx < len(header) else None)
+        meta["number_formats"].append(getattr(cell, "number_format", None) or "General")
+        meta["data_types"].append(getattr(cell, "data_type", None) or "n")
+
+    _xlsx_meta_cache[key] = (stat.st_size, stat.st_mtime_ns, meta)
+    return meta
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required to read Parquet/Feather/Arrow files (pip install pyarrow)")
+
+@contextmanager
+def _ipc_reader(path, options=None):
+    """reader لملف Arrow IPC (file أو stream)؛ الـ memory-map يُغلق عند الخروج (الجداول المقروءة تبقى صالحة)."""
+    with pa.memory_map(path, 'r') as source:
+        try:
+            reader = ipc.open_file(source, options=options)
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = ipc.open_stream(source, options=options)
+        yield reader
+
+def columnar_schema(path):
+    """أسماء الأعمدة فقط من metadata الملف بدون قراءة البيانات."""
+    _require_pyarrow()
+    if path.lower().endswith('.parquet'):
+        schema = pq.read_schema(path, memory_map=True)
+    else:
+        with _ipc_reader(path) as reader:
+            schema = reader.schema
+    return [name for name in schema.names if not name.startswith('__index_level_')]
+
+def read_arrow_table(path, columns=None):
+    """
+    يقرأ الملف كـ pyarrow.Table عبر memory-map، مع قراءة الأعمدة المطلوبة فقط (columns).
+    ملفات Arrow IPC قد تكون بصيغة file أو stream.
+    """
+    _require_pyarrow()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        return pq.read_table(path, columns=columns, memory_map=True)
+    if ext == '.feather':
+        return feather.read_table(path, columns=columns, memory_map=True)
+    if not columns:
+        with _ipc_reader(path) as reader:
+            return reader.read_all()
+    # included_fields يقرأ الأعمدة المطلوبة فقط من كل record batch
+    with _ipc_reader(path) as reader:
+        names = reader.schema.names
+    options = ipc.IpcReadOptions(included_fields=sorted({names.index(col) for col in columns}))
+    with _ipc_reader(path, options) as reader:
+        return reader.read_all().select(columns)
+
+def load_columnar(path, columns=None, arrow_backed=False):
+    """
+    يحمّل Parquet/Feather/Arrow إلى DataFrame.
+    columns: الأعمدة المطلوبة فقط (الأعمدة غير الموجودة تُتجاهل).
+    arrow_backed=False: أنواع numpy كما في CSV (الأعمدة الرقمية بدون قيم فارغة تُنقل بدون نسخ)،
+    arrow_backed=True: أعمدة pd.ArrowDtype بدون أي تحويل.
+    """
+    if columns:
+        available = set(columnar_schema(path))
+        columns = [col for col in columns if col in available] or None
+    table = read_arrow_table(path, columns)
+    if arrow_backed:
+        df = table.to_pandas(types_mapper=pd.ArrowDtype, ignore_metadata=True)
+    else:
+        # split_blocks + self_destruct يحرران ذاكرة Arrow عمودًا بعمود أثناء التحويل
+        df = table.to_pandas(ignore_metadata=True, split_blocks=True, self_destruct=True)
+    index_cols = [col for col in df.columns if str(col).startswith('__index_level_')]
+    return df.drop(columns=index_cols)
+
 def load_sqlite(path):
     """يتصل بقاعدة SQLite ويحمّل كل الجداول في dict."""
     conn = sqlite3.connect(path)
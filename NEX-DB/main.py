@@ -1,12 +1,14 @@
 import os
+import json
 import warnings
 import curses
 import random
 import time
-from utils import Timer
-from loaders import discover_files, load_csv, load_xlsx, load_sqlite
-from analyzers import run_all
-from db_analyzers import run_all_db
+from contextlib import nullcontext
+from utils import Timer, Instrumentation
+from loaders import discover_files
+from pipeline import analyze_files
+from cache import CACHE_NAME
 from report import create_report
 import relationships
 
@@ -152,8 +154,84 @@ def main():
             "NEX-DB ==> Enter your central key file(s) (comma-separated, including extension): "
         ).strip()
         central_files = [n.strip() for n in central_input.split(",") if n.strip()]
+        value_choice = input(
+            "NEX-DB ==> Also match foreign keys by column values? (yes/no): "
+        ).strip().lower()
     else:
         central_files = []
+        value_choice = "no"
+
+
+    workers_input = input("NEX-DB ==> Number of parallel worker processes (blank = 1): ").strip()
+    workers = int(workers_input) if workers_input.isdigit() and int(workers_input) > 0 else 1
+
+    chunk_input = input("NEX-DB ==> Stream CSV files in chunks of N rows (blank = load whole file): ").strip()
+    chunksize = int(chunk_input) if chunk_input.isdigit() and int(chunk_input) > 0 else None
+
+    sample_input = input("NEX-DB ==> Analyze a random sample of N rows per file (blank = all rows): ").strip()
+    sample_rows = int(sample_input) if sample_input.isdigit() and int(sample_input) > 0 else None
+    sample_column, exact_threshold = None, None
+    if sample_rows:
+        sample_column = input("NEX-DB ==> Stratify the sample by column (blank = uniform): ").strip() or None
+        threshold_input = input(
+            "NEX-DB ==> Re-check all rows of columns whose estimated error rate reaches X% (blank = never): "
+        ).strip()
+        try:
+            exact_threshold = float(threshold_input) / 100 if threshold_input else None
+        except ValueError:
+            exact_threshold = None
+
+    near_choice = input("NEX-DB ==> Also look for near-duplicate rows (case, spaces, typos)? (yes/no): ").strip().lower()
+    near_keys, near_threshold = None, None
+    if near_choice == "yes":
+        keys_input = input("NEX-DB ==> Compare rows on columns (comma-separated, blank = all): ").strip()
+        near_keys = [c.strip() for c in keys_input.split(",") if c.strip()] or None
+        near_input = input("NEX-DB ==> Minimum similarity % (blank = allow one typo per value): ").strip()
+        try:
+            near_threshold = float(near_input) / 100 if near_input else None
+        except ValueError:
+            near_threshold = None
+
+    keys_input = input(
+        "NEX-DB ==> Columns that must be unique (comma-separated, a+b = composite key, auto = near-unique columns, blank = skip): "
+    ).strip()
+    if keys_input.lower() == "auto":
+        duplicate_keys = "auto"
+    else:
+        duplicate_keys = [[c.strip() for c in key.split("+") if c.strip()] for key in keys_input.split(",") if key.strip()] or None
+
+    outlier_method = input("NEX-DB ==> Outlier method: sigma, mad or iqr (blank = sigma): ").strip().lower() or None
+    if outlier_method not in (None, "sigma", "mad", "iqr"):
+        outlier_method = None
+    outlier_group = input("NEX-DB ==> Compute outlier limits separately for each value of column (blank = whole column): ").strip() or None
+
+    dates_choice = input(
+        "NEX-DB ==> Convert text date columns to real dates before analysis? "
+        "(with chunks, each column's format is picked from its first chunk) (yes/no): "
+    ).strip().lower()
+
+    safe_choice = input("NEX-DB ==> Check SQLite files in safe read-only mode (no VACUUM)? (yes/no, blank = yes): ").strip().lower()
+    db_profile = "full" if safe_choice == "no" else "safe"
+
+    tables_choice = input("NEX-DB ==> Check SQLite table contents inside the database? (yes/no): ").strip().lower()
+
+    workload = input("NEX-DB ==> SQL workload file for index analysis (blank = foreign key lookups): ").strip() or None
+
+    columns_input = input("NEX-DB ==> Columns to read from Parquet/Feather/Arrow files (comma-separated, blank = all): ").strip()
+    columns = [c.strip() for c in columns_input.split(",") if c.strip()] or None
+
+    cache_choice = input("NEX-DB ==> Reuse saved results for unchanged files? (yes/no): ").strip().lower()
+    cache_path = os.path.join(output_folder, CACHE_NAME) if cache_choice == "yes" else None
+
+    perf_choice = input("NEX-DB ==> Record time per stage and analyzer in a Performance sheet? (yes/no): ").strip().lower()
+    instrument = perf_choice == "yes"
+    memory_choice, json_choice = "no", "no"
+    if instrument:
+        memory_choice = input("NEX-DB ==> Also trace peak memory (slower)? (yes/no): ").strip().lower()
+        json_choice = input("NEX-DB ==> Also save performance data as JSON? (yes/no): ").strip().lower()
+    trace_memory = memory_choice == "yes"
+    run_perf = Instrumentation("ALL", memory=trace_memory) if instrument else None
+    measure = run_perf.measure if run_perf else (lambda *args: nullcontext())
 
 
     files          = discover_files(input_folder)
@@ -161,39 +239,70 @@ def main():
     file_encodings = {}
     file_paths     = {}
     file_dfs       = {}
+    file_sketches  = {}
 
     with Timer() as t:
-        for path in files:
-            ext      = os.path.splitext(path)[1].lower()
-            basename = os.path.basename(path)
-            file_paths[basename] = path
-
-            if ext == ".csv":
-                df, enc = load_csv(path)
-                file_encodings[basename] = enc
-                file_dfs[basename] = df
-                dfs = {"(csv)": df}
-
-            elif ext == ".xlsx":
-                df = load_xlsx(path)
-                file_encodings[basename] = "xlsx"
-                file_dfs[basename] = df
-                dfs = {"(xlsx)": df}
-
-            elif ext in {".db", ".sqlite3"}:
-                file_encodings[basename] = ext.lstrip(".")
-                db_issues = run_all_db(path)
-                print(f"\n--- DB Issues for {basename} ---")
-                for issue in db_issues:
-                    print(issue)
+        results = analyze_files(
+            files,
+            workers=workers,
+            keep_df=similarity_choice == "yes",
+            chunksize=chunksize,
+            db_profile=db_profile,
+            db_tables=tables_choice == "yes",
+            workload=workload,
+            cache_path=cache_path,
+            instrument=instrument,
+            trace_memory=trace_memory,
+            sample_rows=sample_rows,
+            sample_column=sample_column,
+            exact_threshold=exact_threshold,
+            near_duplicates=near_choice == "yes",
+            near_duplicate_keys=near_keys,
+            near_duplicate_threshold=near_threshold,
+            duplicate_keys=duplicate_keys,
+            outlier_method=outlier_method,
+            outlier_group=outlier_group,
+            parse_dates=dates_choice == "yes",
+            columns=columns
+        )
+        cached_count = sum(res["cached"] for res in results)
+        if cached_count:
+            print(f"♻️ Reused saved results for {cached_count} of {len(results)} file(s)")
+        for res in results:
+            basename = res["basename"]
+
+            if res["error"]:
+                print(f"⚠️ Warning: failed to analyze '{basename}': {res['error']}")
+                file_encodings[basename] = res["encoding"] or ""
+                all_issues[f"{basename} (error)"] = [{
+                    "column":  "ALL",
+                    "issue":   "File Could Not Be Analyzed",
+                    "count":   0,
+                    "pct":     "-",
+                    "details": res["error"],
+                    "rows":    "-"
+                }]
                 continue
 
-            else:
+            if res["encoding"] is None:
                 continue
+            file_paths[basename]     = res["path"]
+            file_encodings[basename] = res["encoding"]
 
-            for suffix, df in dfs.items():
-                key = f"{basename} {suffix}"
-                all_issues[key] = run_all(df)
+            if res["ext"] in {".db", ".sqlite3"}:
+                print(f"\n--- DB Issues for {basename} ---")
+                for issue in res["db_issues"]:
+                    print(issue)
+                for name, seconds in res["db_timings"].items():
+                    print(f"⏱ {name}: {seconds:.3f}s")
+                all_issues.update(res["issues"])
+                continue
+
+            if res["df"] is not None:
+                file_dfs[basename] = res["df"]
+            if res["sketches"] is not None:
+                file_sketches[basename] = res["sketches"]
+            all_issues.update(res["issues"])
 
 
     time_stats = {
@@ -203,15 +312,31 @@ def main():
     }
 
 
-    create_report(all_issues, time_stats, file_encodings, file_paths, output_path)
-
     if similarity_choice == "yes":
-        rels = relationships.compute_relationships(
-            file_dfs,
-            central_files,
-            threshold=0.9
-        )
-        relationships.add_relationships_to_report(output_path, rels)
+        with measure("relationships"):
+            rels = relationships.compute_relationships(
+                file_dfs,
+                central_files,
+                threshold=0.9
+            )
+            if value_choice == "yes":
+                rels += relationships.compute_value_relationships(file_dfs, central_files,
+                                                                  sketches=file_sketches)
+
+    file_perf = [rec for res in results for rec in res["perf"]]
+    performance = file_perf + (run_perf.records if run_perf else [])
+
+    with measure("report"):
+        create_report(all_issues, time_stats, file_encodings, file_paths, output_path,
+                      performance=performance)
+        if similarity_choice == "yes":
+            relationships.add_relationships_to_report(output_path, rels)
+
+    if json_choice == "yes":
+        # مرحلة report نفسها لا تظهر في الورقة لأنها تُقاس أثناء كتابتها، لكنها في JSON
+        json_path = os.path.splitext(output_path)[0] + "_performance.json"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(file_perf + run_perf.records, f, indent=2, ensure_ascii=False)
 
     print("")
     logo = """
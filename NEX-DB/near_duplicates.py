@@ -0,0 +1,220 @@
+# near_duplicates.py
+"""
+كشف الصفوف شبه المكررة (اختلاف المسافات أو حالة الأحرف أو أخطاء إملائية بسيطة) بدون مقارنة كل صفين:
+
+1) كل صف يُحوَّل لنص موحد من أعمدة المفتاح (lower + مسافات موحدة)، والنصوص المتطابقة تُحسب مرة واحدة.
+2) لكل نص توقيع MinHash لمجموعة الـ 3-grams، و LSH (bands) يضع النصوص المتشابهة في نفس الـ bucket.
+3) الأزواج المرشحة فقط تُقارن فعليًا (Jaccard على الـ 3-grams)، ثم تُجمع في مجموعات (union-find).
+"""
+import zlib
+import numpy as np
+import pandas as pd
+from column_profile import FrameProfile
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+WINDOW = 20  # داخل bucket كبير يُقارن كل نص بأقرب WINDOW نص بعده في الترتيب الأبجدي (sorted neighbourhood)
+PRIME = 4_294_967_291  # أكبر عدد أولي أقل من 2^32، فالتوقيع يكفيه uint32
+DEFAULT_THRESHOLD = 0.85
+TYPO_FLOOR = 0.3  # أقل عتبة لاختيار المرشحين (نصوص من 8 أحرف تقريبًا)، تحد من عدد الأزواج المرشحة
+
+
+def normalize_rows(profile: FrameProfile, keys: list) -> tuple[pd.Series, np.ndarray]:
+    """النص الموحد لكل صف، وقناع الصفوف التي كل أعمدة المفتاح فيها فارغة."""
+    parts = []
+    for col in keys:
+        text = profile[col].strings.where(~profile[col].null_mask, "")
+        parts.append(text.str.lower().str.replace(r"\s+", " ", regex=True).str.strip())
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined + " | " + part
+    blank = np.logical_and.reduce([(part == "").to_numpy() for part in parts])
+    return joined, blank
+
+
+def shingles(text: str) -> set:
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signatures(shingle_sets: list[set], num_perm: int = NUM_PERM, seed: int = 0,
+                       batch: int = 20_000) -> np.ndarray:
+    """
+    توقيع MinHash لكل مجموعة. كل 3-gram مميز يُحسب له الـ hash مرة واحدة، ثم تُعالج
+    الـ 3-grams على دفعات ثابتة من batch (الصف الطويل قد يمتد على أكثر من دفعة):
+    التباديل يُحسب للدفعة فقط ويُحدَّث الحد الأدنى لكل صف فيها، فالذاكرة num_perm × batch
+    مهما كان عدد الـ 3-grams المميزة.
+    """
+    rng = np.random.default_rng(seed)
+    # a < 2^31 و hash < 2^32 حتى لا يتجاوز a*h + b حدود uint64
+    a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+    lengths = np.fromiter(map(len, shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    ids, distinct = pd.factorize(pd.Series([g for grams in shingle_sets for g in grams], dtype=object))
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in distinct), dtype=np.uint64, count=len(distinct))
+    rows = np.repeat(np.arange(len(shingle_sets)), lengths)
+
+    signatures = np.full((len(shingle_sets), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, len(ids), batch):
+        block_rows = rows[start:start + batch]
+        permuted = ((a * hashes[ids[start:start + batch]] + b) % np.uint64(PRIME)).astype(np.uint32)
+        firsts = np.flatnonzero(np.r_[True, block_rows[1:] != block_rows[:-1]])
+        touched = block_rows[firsts]
+        mins = np.minimum.reduceat(permuted, firsts, axis=1).T
+        signatures[touched] = np.minimum(signatures[touched], mins)
+    return signatures
+
+
+def typo_thresholds(counts: np.ndarray) -> np.ndarray:
+    """
+    أقل تشابه لنص فيه m من الـ 3-grams مع نسخة منه بخطأ إملائي واحد: تعديل حرف واحد (استبدال أو
+    حذف أو إضافة) يغيّر 3 grams على الأكثر، فيبقى التشابه (m-3)/(m+3) على الأقل.
+    الأسماء القصيرة ("john smith" و "jon smith" = 0.5) تحتاج عتبة أقل بكثير من النصوص الطويلة،
+    لذلك تُحصر بين TYPO_FLOOR و DEFAULT_THRESHOLD وتُستخدم لاختيار المرشحين فقط.
+    """
+    m = counts.astype(np.float64)
+    return np.clip((m - SHINGLE_SIZE) / (m + SHINGLE_SIZE), TYPO_FLOOR, DEFAULT_THRESHOLD)
+
+
+def one_edit(a: str, b: str) -> bool:
+    """
+    مسافة Levenshtein بين النصين 1 على الأكثر (تبديل حرفين متجاورين يُعد تعديلين).
+    التعديل على رقم أو بجواره لا يُعد خطأ إملائيًا: value_12 و value_13 أو 1.5 و 15 قيمتان مختلفتان.
+    """
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return not numeric_at(b, i) and a[i:] == b[i + 1:]
+    if i == len(a):
+        return True
+    return not (numeric_at(a, i) or numeric_at(b, i)) and a[i + 1:] == b[i + 1:]
+
+
+def numeric_at(text: str, i: int) -> bool:
+    return any(text[k].isdigit() for k in range(max(0, i - 1), min(len(text), i + 2)))
+
+
+def lsh_bands(threshold: float, num_perm: int = NUM_PERM) -> int:
+    """
+    عدد الصفوف في كل band: الأكبر الذي تبقى عتبة منحنى LSH ((1/b)^(1/r)) عنده
+    أقل من threshold بهامش، حتى لا تضيع أزواج متشابهة فعلًا.
+    """
+    best = 1
+    for r in (1, 2, 4, 8, 16):
+        if num_perm % r == 0 and (r / num_perm) ** (1 / r) <= threshold - 0.1:
+            best = r
+    return best
+
+
+def candidate_pairs(signatures: np.ndarray, rows_per_band: int, window: int = WINDOW,
+                    rank: np.ndarray = None) -> np.ndarray:
+    """
+    rank: ترتيب كل نص (مثلاً أبجديًا)؛ داخل نفس الـ bucket تُرتب النصوص به قبل مقارنة كل نص
+    بالـ window نص التالية، فتُقارن النصوص المتقاربة لا التي جاءت متجاورة في الملف.
+    """
+    rank = np.arange(len(signatures)) if rank is None else rank
+    pairs = []
+    for start in range(0, signatures.shape[1], rows_per_band):
+        # مفتاح الـ bucket: hash واحد لقيم الـ band (التصادم النادر يضيف مرشحًا يُستبعد عند المقارنة فقط)
+        bucket = np.zeros(len(signatures), dtype=np.uint64)
+        for column in signatures[:, start:start + rows_per_band].T:
+            bucket = bucket * np.uint64(0x100000001B3) + column.astype(np.uint64)
+        order = np.lexsort((rank, bucket))
+        sorted_bucket = bucket[order]
+        for k in range(1, min(window, len(order) - 1) + 1):
+            same = sorted_bucket[k:] == sorted_bucket[:-k]
+            if not same.any():
+                break
+            pairs.append(np.column_stack([order[:-k][same], order[k:][same]]))
+    return unique_pairs(pairs, len(signatures))
+
+
+def unique_pairs(pairs: list[np.ndarray], n: int) -> np.ndarray:
+    """الأزواج (i < j) بدون تكرار، مرتبة."""
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1).astype(np.int64)
+    # ترتيب ثم حذف المتكرر المتجاور: np.unique على أعداد صحيحة يمر بجدول hash أبطأ بكثير مع ملايين الأزواج
+    keys = np.sort(pairs[:, 0] * n + pairs[:, 1])
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return np.column_stack([keys // n, keys % n])
+
+
+def estimated_similarity(signatures: np.ndarray, pairs: np.ndarray, batch: int = 100_000) -> np.ndarray:
+    """تقدير Jaccard من التوقيعات (نسبة الـ hashes المتساوية) لكل الأزواج دفعة واحدة."""
+    estimates = np.empty(len(pairs))
+    for start in range(0, len(pairs), batch):
+        i, j = pairs[start:start + batch, 0], pairs[start:start + batch, 1]
+        estimates[start:start + batch] = (signatures[i] == signatures[j]).mean(axis=1)
+    return estimates
+
+
+def find_near_duplicates(df: pd.DataFrame, keys: list = None, threshold: float = None,
+                         profile: FrameProfile = None) -> list[np.ndarray]:
+    """
+    مجموعات الصفوف المتشابهة بنسبة threshold على الأقل (أرقام مواضع الصفوف، مرتبة).
+    threshold=None: تشابه DEFAULT_THRESHOLD على الأقل، أو نصان موحدان بينهما خطأ إملائي واحد (one_edit)؛
+    المرشحون يُختارون بعتبة كل نص حسب طوله (typo_thresholds) حتى لا تضيع أخطاء الأسماء القصيرة.
+    تُستبعد المجموعات التي صفوفها متطابقة تمامًا (كل الأعمدة) لأنها تظهر في Full Duplicate Rows.
+    """
+    profile = profile if profile is not None and profile.df is df else FrameProfile(df)
+    keys = [col for col in (keys or []) if col in df.columns] or list(df.columns)
+    if df.empty or not keys:
+        return []
+    text, blank = normalize_rows(profile, keys)
+    codes, uniques = pd.factorize(text)
+    shingle_sets = [shingles(t) for t in uniques]
+
+    parent = np.arange(len(uniques))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if len(uniques) > 1:
+        texts = uniques.to_numpy(dtype=object)
+        if threshold is None:
+            counts = np.fromiter(map(len, shingle_sets), dtype=np.int64, count=len(shingle_sets))
+            bounds = typo_thresholds(counts)
+        else:
+            bounds = np.full(len(uniques), threshold)
+        signatures = minhash_signatures(shingle_sets)
+        rank = np.argsort(np.argsort(texts, kind="stable"), kind="stable")
+        pairs = candidate_pairs(signatures, lsh_bands(DEFAULT_THRESHOLD if threshold is None else threshold), rank=rank)
+        short = np.flatnonzero(bounds < DEFAULT_THRESHOLD) if threshold is None else []
+        if len(short) > 1:
+            # النصوص القصيرة فقط تحتاج bands أصغر (مرشحين أكثر)؛ الزوج مع نص طويل حده DEFAULT_THRESHOLD
+            extra = candidate_pairs(signatures[short], lsh_bands(bounds[short].min()), rank=rank[short])
+            pairs = unique_pairs([pairs, short[extra]], len(texts))
+        limit = DEFAULT_THRESHOLD if threshold is None else threshold
+        # التقدير يستبعد معظم الأزواج البعيدة قبل حساب Jaccard الفعلي في Python
+        estimates = estimated_similarity(signatures, pairs)
+        by_jaccard = estimates >= limit - 0.1
+        by_typo = np.zeros(len(pairs), dtype=bool)
+        if threshold is None:
+            # حد الزوج هو حد النص الأطول (الأعلى)، والخطأ الواحد لا يغير الطول بأكثر من حرف
+            lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+            pair_bounds = np.maximum(bounds[pairs[:, 0]], bounds[pairs[:, 1]])
+            by_typo = (estimates >= pair_bounds - 0.1) & (np.abs(lengths[pairs[:, 0]] - lengths[pairs[:, 1]]) <= 1)
+        keep = by_jaccard | by_typo
+        for (i, j), jaccard, typo in zip(pairs[keep], by_jaccard[keep], by_typo[keep]):
+            a, b = shingle_sets[i], shingle_sets[j]
+            if (jaccard and len(a & b) / len(a | b) >= limit) or (typo and one_edit(texts[i], texts[j])):
+                parent[find(i)] = find(j)
+
+    roots = np.array([find(i) for i in range(len(uniques))])
+    frame = pd.DataFrame({
+        "cluster": roots[codes],
+        "raw": pd.util.hash_pandas_object(df, index=False).to_numpy(),
+    })[~blank]
+    frame = frame[frame.groupby("cluster")["raw"].transform("nunique") > 1]
+    groups = [positions.to_numpy() for positions in frame.groupby("cluster").groups.values()]
+    return sorted(groups, key=lambda g: g[0])
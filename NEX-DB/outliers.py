@@ -0,0 +1,418 @@
+# outliers.py
+"""
+طرق كشف القيم الشاذة لـ OutliersAnalyzer و OutliersStream:
+
+    sigma  المتوسط ± k·σ (k=3)، الطريقة الافتراضية
+    mad    الوسيط ± k·1.4826·MAD (k=3.5)، لا تتأثر بالقيم الشاذة نفسها
+    iqr    [Q1 - k·IQR, Q3 + k·IQR] (k=1.5)
+
+كل طريقة تحسب الحدود بدقة على عمود في الذاكرة (bounds / group_bounds)، ولها حالة للتحليل
+على دفعات (new_state) تعتمد على ملخص KLL للكميات يمكن دمجه بين الدفعات أو العمليات المتوازية.
+مع عمود تجميع تُستخدم new_group_state: عزوم sigma تُحسب لكل المجموعات معًا بـ groupby،
+أما ملخصات KLL فواحد لكل مجموعة حتى MAX_SKETCH_GROUPS مجموعة، وبعدها تُحسب الحدود على العمود كله.
+"""
+import math
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+
+MAD_SCALE = 1.4826  # يجعل MAD مقدّرًا لـ σ في التوزيع الطبيعي
+MAX_SKETCH_GROUPS = 1_000
+
+OUTLIER_DETECTORS: dict[str, type["OutlierDetector"]] = {}
+
+def register_detector(cls: type["OutlierDetector"]) -> type["OutlierDetector"]:
+    OUTLIER_DETECTORS[cls.name] = cls
+    return cls
+
+def get_detector(method: str = None, k: float = None) -> "OutlierDetector":
+    if method and method not in OUTLIER_DETECTORS:
+        raise ValueError(f"Unknown outlier method '{method}', expected one of: {', '.join(OUTLIER_DETECTORS)}")
+    return OUTLIER_DETECTORS[method or "sigma"](k)
+
+
+class KLLSketch:
+    """
+    ملخص KLL للكميات التقريبية: ذاكرة O(k log n) وخطأ في الترتيب حوالي 1.7/k من عدد القيم.
+    المستوى h يحمل قيمًا وزن كل منها 2^h؛ عند امتلائه تُرتب قيمه ويُرفع نصفها (بإزاحة عشوائية) للمستوى التالي.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values) -> "KLLSketch":
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self.compress()
+        return self
+
+    def compress(self) -> None:
+        while True:
+            full = [h for h, items in enumerate(self.levels) if len(items) > self.capacity(h)]
+            if not full:
+                return
+            h = full[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[h])
+            n = len(items) - len(items) % 2  # عدد زوجي، والقيمة الزائدة تبقى في نفس المستوى
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[self.rng.integers(2):n:2]])
+            self.levels[h] = items[n:]
+
+    def quantiles(self, qs) -> np.ndarray:
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        if len(self.levels) == 1:
+            # لم يُضغط شيء بعد، فالقيم كلها موجودة: نفس الاستيفاء الخطي الذي يستخدمه pandas
+            return np.quantile(self.levels[0], qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2 ** h) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return items[order][np.minimum(idx, len(items) - 1)]
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+class OutlierDetector(ABC):
+    name: str
+    default_k: float
+
+    def __init__(self, k: float = None):
+        self.k = k or self.default_k
+
+    @abstractmethod
+    def bounds(self, values: pd.Series) -> tuple[float, float, float]:
+        """(الحد الأدنى، الحد الأعلى، المركز) لقيم غير فارغة."""
+
+    @abstractmethod
+    def group_bounds(self, values: pd.Series, keys: pd.Series) -> pd.DataFrame:
+        """نفس الحدود لكل مجموعة: DataFrame بأعمدة low, high, center و index = قيمة المجموعة."""
+
+    @abstractmethod
+    def new_state(self) -> "StreamState":
+        pass
+
+    def new_group_state(self) -> "SketchGroupState":
+        return SketchGroupState(self)
+
+    @property
+    @abstractmethod
+    def label(self) -> str:
+        pass
+
+    @abstractmethod
+    def describe(self, low: float, high: float, center: float) -> str:
+        pass
+
+    @property
+    def stat_passes(self) -> int:
+        """عدد قراءات الملف اللازمة قبل معرفة الحدود."""
+        return self.new_state().passes
+
+
+class StreamState(ABC):
+    """حالة عمود (أو مجموعة داخل عمود) أثناء التحليل على دفعات؛ bounds تُضبط بعد آخر قراءة إحصائية."""
+    passes = 1
+
+    def __init__(self, detector: OutlierDetector):
+        self.detector = detector
+        self.bounds = None
+
+    @abstractmethod
+    def update(self, values: np.ndarray, pass_no: int) -> None:
+        pass
+
+    @abstractmethod
+    def merge(self, other: "StreamState") -> "StreamState":
+        pass
+
+    @abstractmethod
+    def end_pass(self, pass_no: int) -> None:
+        pass
+
+
+class SketchGroupState:
+    """
+    حالة لكل مجموعة داخل العمود، وحالة للعمود كله (total) تُستخدم إذا تجاوز عدد المجموعات
+    MAX_SKETCH_GROUPS (overflow) حتى لا تكبر الذاكرة ويبطؤ التحديث مع عدد المجموعات.
+    """
+
+    def __init__(self, detector: OutlierDetector):
+        self.detector = detector
+        self.states: dict = {}
+        self.total = detector.new_state()
+        self.overflow = False
+
+    def update(self, values: np.ndarray, codes: np.ndarray, uniques, pass_no: int) -> None:
+        valid = ~np.isnan(values)
+        values, codes = values[valid], codes[valid]
+        self.total.update(values, pass_no)
+        if self.overflow or not len(values):
+            return
+        order = np.argsort(codes, kind="stable")
+        cuts = np.flatnonzero(np.diff(codes[order])) + 1
+        for code, idx in zip(codes[order][np.r_[0, cuts]], np.split(order, cuts)):
+            key = uniques[code]
+            if key not in self.states:
+                if len(self.states) >= MAX_SKETCH_GROUPS:
+                    self.overflow, self.states = True, {}
+                    return
+                self.states[key] = self.detector.new_state()
+            self.states[key].update(values[idx], pass_no)
+
+    def merge(self, other: "SketchGroupState") -> "SketchGroupState":
+        self.total.merge(other.total)
+        if not (self.overflow or other.overflow):
+            for key, state in other.states.items():
+                self.states[key] = self.states[key].merge(state) if key in self.states else state
+        if other.overflow or len(self.states) > MAX_SKETCH_GROUPS:
+            self.overflow, self.states = True, {}
+        return self
+
+    def end_pass(self, pass_no: int) -> None:
+        self.total.end_pass(pass_no)
+        for state in self.states.values():
+            state.end_pass(pass_no)
+
+    def bounds_for(self, uniques) -> tuple[np.ndarray, np.ndarray]:
+        """الحد الأدنى والأعلى لكل قيمة في uniques (NaN للمجموعات التي لا حدود لها)."""
+        if self.overflow:
+            low, high, _ = self.total.bounds
+            return np.full(len(uniques), low, dtype="float64"), np.full(len(uniques), high, dtype="float64")
+        table = np.array([self.states[k].bounds[:2] if k in self.states else (np.nan, np.nan) for k in uniques],
+                         dtype="float64").reshape(-1, 2)
+        return table[:, 0], table[:, 1]
+
+
+def no_spread(low, high, center):
+    # انتشار صفري (كل القيم تقريبًا متساوية) يجعل كل قيمة مختلفة شاذة، فلا تُحسب حدود
+    return (np.nan, np.nan, center) if low == high else (low, high, center)
+
+
+@register_detector
+class SigmaDetector(OutlierDetector):
+    name = "sigma"
+    default_k = 3
+
+    def bounds(self, values):
+        mean, std = values.mean(), values.std()
+        return mean - self.k*std, mean + self.k*std, mean
+
+    def group_bounds(self, values, keys):
+        stats = values.groupby(keys).agg(["mean", "std"])
+        return pd.DataFrame({"low": stats["mean"] - self.k*stats["std"],
+                             "high": stats["mean"] + self.k*stats["std"], "center": stats["mean"]})
+
+    def new_state(self):
+        return MomentsState(self)
+
+    def new_group_state(self):
+        return MomentsGroupState(self)
+
+    @property
+    def label(self):
+        return f"±{self.k}σ"
+
+    def describe(self, low, high, center):
+        return f"outside {self.label} (mean={center:.2f})"
+
+
+class MomentsState(StreamState):
+    def __init__(self, detector):
+        super().__init__(detector)
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, n_b: int, mean_b: float, m2_b: float) -> None:
+        # دمج متوسط وانحراف مجموعتين (Chan et al.)
+        if not self.n:
+            self.n, self.mean, self.m2 = n_b, mean_b, m2_b
+            return
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean, self.m2 = self.mean + delta * n_b / n, self.m2 + m2_b + delta ** 2 * self.n * n_b / n
+        self.n = n
+
+    def update(self, values, pass_no):
+        if len(values):
+            self.add(len(values), values.mean(), ((values - values.mean()) ** 2).sum())
+
+    def merge(self, other):
+        if other.n:
+            self.add(other.n, other.mean, other.m2)
+        return self
+
+    def end_pass(self, pass_no):
+        std = np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+        k = self.detector.k
+        self.bounds = (self.mean - k*std, self.mean + k*std, self.mean)
+
+
+class MomentsGroupState:
+    """n والمتوسط ومجموع مربعات الانحراف لكل المجموعات في DataFrame واحد (index = المجموعة)، تُدمج كأعمدة."""
+    overflow = False
+
+    def __init__(self, detector: SigmaDetector):
+        self.detector = detector
+        self.stats = pd.DataFrame({"n": [], "mean": [], "m2": []}, dtype="float64")
+        self.low = self.high = None
+
+    def add(self, other: pd.DataFrame) -> None:
+        # نفس دمج MomentsState.add (Chan et al.) لكل المجموعات دفعة واحدة
+        index = self.stats.index.union(other.index)
+        a = self.stats.reindex(index, fill_value=0.0)
+        b = other.reindex(index, fill_value=0.0)
+        n = a["n"] + b["n"]
+        delta = b["mean"] - a["mean"]
+        self.stats = pd.DataFrame({
+            "n": n,
+            "mean": a["mean"] + delta * b["n"] / n,
+            "m2": a["m2"] + b["m2"] + delta ** 2 * a["n"] * b["n"] / n,
+        })
+
+    def update(self, values, codes, uniques, pass_no):
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        grouped = pd.Series(values[valid]).groupby(codes[valid]).agg(["count", "mean", "var"])
+        self.add(pd.DataFrame({
+            "n": grouped["count"].astype("float64"),
+            "mean": grouped["mean"],
+            "m2": grouped["var"].fillna(0.0) * (grouped["count"] - 1),
+        }).set_axis(uniques.take(grouped.index)))
+
+    def merge(self, other):
+        self.add(other.stats)
+        return self
+
+    def end_pass(self, pass_no):
+        stats = self.stats
+        std = np.sqrt(stats["m2"] / (stats["n"] - 1)).where(stats["n"] > 1)
+        k = self.detector.k
+        self.low, self.high = stats["mean"] - k*std, stats["mean"] + k*std
+
+    def bounds_for(self, uniques):
+        return self.low.reindex(uniques).to_numpy(dtype="float64"), self.high.reindex(uniques).to_numpy(dtype="float64")
+
+
+@register_detector
+class MADDetector(OutlierDetector):
+    name = "mad"
+    default_k = 3.5
+
+    def bounds(self, values):
+        median = values.median()
+        spread = self.k * MAD_SCALE * (values - median).abs().median()
+        return no_spread(median - spread, median + spread, median)
+
+    def group_bounds(self, values, keys):
+        median = values.groupby(keys).median()
+        spread = self.k * MAD_SCALE * (values - keys.map(median)).abs().groupby(keys).median()
+        table = pd.DataFrame({"low": median - spread, "high": median + spread, "center": median})
+        table.loc[spread == 0, ["low", "high"]] = np.nan
+        return table
+
+    def new_state(self):
+        return MADState(self)
+
+    @property
+    def label(self):
+        return f"median ± {self.k}·MAD"
+
+    def describe(self, low, high, center):
+        return f"outside {self.label} (median={center:.2f})"
+
+
+class MADState(StreamState):
+    """القراءة الأولى: ملخص القيم للوسيط، والثانية: ملخص |x - الوسيط| لـ MAD."""
+    passes = 2
+
+    def __init__(self, detector):
+        super().__init__(detector)
+        self.values = KLLSketch()
+        self.deviations = KLLSketch()
+        self.median = None
+
+    def update(self, values, pass_no):
+        if pass_no == 0:
+            self.values.update(values)
+        elif self.median is not None:
+            self.deviations.update(np.abs(values - self.median))
+
+    def merge(self, other):
+        self.values.merge(other.values)
+        self.deviations.merge(other.deviations)
+        return self
+
+    def end_pass(self, pass_no):
+        if pass_no == 0:
+            self.median = self.values.quantile(0.5)
+        else:
+            spread = self.detector.k * MAD_SCALE * self.deviations.quantile(0.5)
+            self.bounds = no_spread(self.median - spread, self.median + spread, self.median)
+
+
+@register_detector
+class IQRDetector(OutlierDetector):
+    name = "iqr"
+    default_k = 1.5
+
+    def bounds(self, values):
+        q1, q3 = values.quantile([0.25, 0.75])
+        return no_spread(q1 - self.k*(q3 - q1), q3 + self.k*(q3 - q1), values.median())
+
+    def group_bounds(self, values, keys):
+        grouped = values.groupby(keys)
+        q1, q3, median = grouped.quantile(0.25), grouped.quantile(0.75), grouped.median()
+        table = pd.DataFrame({"low": q1 - self.k*(q3 - q1), "high": q3 + self.k*(q3 - q1), "center": median})
+        table.loc[q3 == q1, ["low", "high"]] = np.nan
+        return table
+
+    def new_state(self):
+        return QuantileState(self)
+
+    @property
+    def label(self):
+        return f"Q1 - {self.k}·IQR .. Q3 + {self.k}·IQR"
+
+    def describe(self, low, high, center):
+        return f"outside {self.label} ({low:.2f} .. {high:.2f})"
+
+
+class QuantileState(StreamState):
+    def __init__(self, detector):
+        super().__init__(detector)
+        self.values = KLLSketch()
+
+    def update(self, values, pass_no):
+        self.values.update(values)
+
+    def merge(self, other):
+        self.values.merge(other.values)
+        return self
+
+    def end_pass(self, pass_no):
+        q1, median, q3 = self.values.quantiles([0.25, 0.5, 0.75])
+        k = self.detector.k
+        self.bounds = no_spread(q1 - k*(q3 - q1), q3 + k*(q3 - q1), median)
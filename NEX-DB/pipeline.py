@@ -0,0 +1,235 @@
+# pipeline.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from loaders import COLUMNAR_EXTS, load_columnar, load_csv, load_csv_chunks, load_xlsx
+from analyzers import run_all
+from db_analyzers import run_all_db_many
+from streaming import run_streaming
+from sampling import reservoir_sample_csv, run_sampled, stratified_sample, uniform_sample
+from cache import ResultCache, analyzer_version
+from sketches import update_sketches
+from utils import Instrumentation
+
+DB_EXTS = {".db", ".sqlite3"}
+
+
+def _new_result(path: str) -> dict:
+    return {
+        "path":      path,
+        "basename":  os.path.basename(path),
+        "ext":       os.path.splitext(path)[1].lower(),
+        "encoding":  None,
+        "issues":    {},
+        "db_issues": [],
+        "db_timings": {},
+        "perf":      [],
+        "df":        None,
+        "sketches":  None,
+        "error":     None,
+        "cached":    False
+    }
+
+
+def analyze_file(path: str, keep_df: bool = False, chunksize: int = None,
+                 instrument: bool = False, trace_memory: bool = False, sample_rows: int = None,
+                 sample_column: str = None, exact_threshold: float = None, columns: list = None,
+                 **kwargs) -> dict:
+    """
+    يحمّل ملفًا واحدًا (CSV/Excel/Parquet/Feather/Arrow) ويشغّل عليه كل المحللات.
+    قواعد SQLite لا تمر من هنا: analyze_files تحللها كلها معًا بـ run_all_db_many.
+    مع chunksize تُحلَّل ملفات CSV على دفعات (streaming.py) بدل تحميلها كاملة.
+    مع sample_rows تُحلَّل عينة وتُقدَّر الأخطاء بفترات ثقة (sampling.py)؛ عينة CSV تؤخذ
+    أثناء القراءة (reservoir) إلا إذا طُلب تقسيمها حسب عمود (sample_column).
+    في هذين المسارين "df" عينة فقط، لذلك مع keep_df تُلخَّص أعمدة الملف كله أثناء نفس القراءة
+    في "sketches" (sketches.py) لتُحسب العلاقات بين الملفات من كل القيم.
+    مع instrument تُسجَّل مدة كل مرحلة وكل محلل في "perf" (وأعلى ذاكرة مع trace_memory).
+    أي استثناء يُسجَّل في "error" بدل أن يوقف التشغيل كله.
+    """
+    result = _new_result(path)
+    ext = result["ext"]
+    basename = result["basename"]
+    instrumentation = Instrumentation(basename, memory=trace_memory) if instrument else None
+    measure = instrumentation.measure if instrumentation else (lambda *args: nullcontext())
+    hook = instrumentation.analyzer_hook if instrumentation else None
+    if instrumentation:
+        result["perf"] = instrumentation.records
+    try:
+        sketches = {} if keep_df else None
+        if ext == ".csv" and sample_rows and not sample_column:
+            with measure("load"):
+                sample, population, enc = reservoir_sample_csv(path, sample_rows, chunksize or 100_000,
+                                                               sketches=sketches)
+            result["encoding"] = enc
+            with measure("analyze"):
+                result["issues"][f"{basename} (csv)"] = run_sampled(
+                    sample, population, exact=lambda cols: load_csv(path, usecols=cols)[0],
+                    exact_threshold=exact_threshold, hook=hook, **kwargs)
+            if keep_df:
+                result["df"], result["sketches"] = sample, sketches
+            return result
+
+        elif ext == ".csv" and chunksize:
+            with measure("stream"):
+                issues, enc, sample = run_streaming(path, chunksize=chunksize, sketches=sketches, **kwargs)
+            result["encoding"] = enc
+            result["issues"][f"{basename} (csv)"] = issues
+            if keep_df:
+                result["df"], result["sketches"] = sample, sketches
+            return result
+
+        elif ext == ".csv":
+            with measure("load"):
+                df, enc = load_csv(path)
+            result["encoding"] = enc
+            dfs = {"(csv)": df}
+
+        elif ext == ".xlsx":
+            with measure("load"):
+                df = load_xlsx(path)
+            result["encoding"] = "xlsx"
+            dfs = {"(xlsx)": df}
+
+        elif ext in COLUMNAR_EXTS:
+            with measure("load"):
+                df = load_columnar(path, columns=columns)
+            result["encoding"] = ext.lstrip(".")
+            dfs = {f"({result['encoding']})": df}
+
+        else:
+            return result
+
+        for suffix, df in dfs.items():
+            key = f"{basename} {suffix}"
+            with measure("analyze"):
+                if sample_rows and len(df) > sample_rows:
+                    if sample_column in df.columns:
+                        sample = stratified_sample(df, sample_column, sample_rows)
+                    else:
+                        sample = uniform_sample(df, sample_rows)
+                    result["issues"][key] = run_sampled(sample, len(df), exact=df, exact_threshold=exact_threshold,
+                                                        hook=hook, **kwargs)
+                else:
+                    result["issues"][key] = run_all(df, hook=hook, **kwargs)
+        if keep_df:
+            result["df"] = df
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def load_frame(path: str, chunksize: int = None, sketches: dict = None):
+    """
+    يحمّل DataFrame الملف فقط بدون تحليل (لنتائج الذاكرة عند الحاجة لمقارنة الأعمدة).
+    مع chunksize يُرجع أول دفعة فقط، ويُلخَّص الملف كله في sketches كما في analyze_file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".csv" and chunksize:
+            chunks, _ = load_csv_chunks(path, chunksize=chunksize)
+            first = None
+            for chunk in chunks:
+                if first is None:
+                    first = chunk
+                if sketches is None:
+                    break
+                update_sketches(sketches, chunk)
+            return first
+        if ext == ".csv":
+            return load_csv(path)[0]
+        if ext == ".xlsx":
+            return load_xlsx(path)
+        if ext in COLUMNAR_EXTS:
+            return load_columnar(path)
+    except Exception:
+        pass
+    return None
+
+
+def analyze_files(paths: list[str], workers: int = 1, keep_df: bool = False,
+                  chunksize: int = None, db_profile: str = "full", db_tables: bool = False,
+                  cache_path: str = None, instrument: bool = False, trace_memory: bool = False,
+                  sample_rows: int = None, **kwargs) -> list[dict]:
+    """
+    يحلل الملفات بالتوازي في عمليات منفصلة (workers > 1) أو بالتتابع.
+    قواعد SQLite تُحلل في threads بجلسة قراءة واحدة لكل قاعدة (run_all_db_many)،
+    ومع db_tables تُفحص محتويات جداولها داخل SQLite نفسها (pushdown.py).
+    مع cache_path تُستخدم النتائج المحفوظة للملفات التي لم تتغير (cache.py) ويُحلل الباقي فقط.
+    النتائج تُرجع دائمًا بنفس ترتيب paths.
+    """
+    results = {}
+    cache = None
+    if cache_path:
+        version = analyzer_version(chunksize=chunksize, db_profile=db_profile, db_tables=db_tables,
+                                   sample_rows=sample_rows, **kwargs)
+        cache = ResultCache(cache_path, version)
+        for path in paths:
+            result = cache.get(path)
+            if result is not None:
+                result["cached"] = True
+                result["perf"] = []
+                if keep_df:
+                    sketches = {} if chunksize and result["ext"] == ".csv" else None
+                    result["df"] = load_frame(path, chunksize, sketches)
+                    result["sketches"] = sketches
+                results[path] = result
+
+    pending = [path for path in paths if path not in results]
+    results.update(_analyze_pending(pending, workers, keep_df, chunksize, db_profile, db_tables,
+                                    instrument, trace_memory, sample_rows, **kwargs))
+
+    if cache is not None:
+        for path in pending:
+            if not results[path]["error"]:
+                cache.put(path, results[path])
+        cache.prune(paths)
+        cache.close()
+    return [results[path] for path in paths]
+
+
+def _analyze_pending(paths, workers, keep_df, chunksize, db_profile, db_tables,
+                     instrument, trace_memory, sample_rows, **kwargs) -> dict:
+    db_paths = [path for path in paths if os.path.splitext(path)[1].lower() in DB_EXTS]
+    db_set = set(db_paths)
+    file_paths = [path for path in paths if path not in db_set]
+    # columns خاص بقراءة ملفات Parquet/Feather/Arrow فلا يُمرر لمحللات SQLite أو run_all،
+    # وكذلك خيارات العينة التي لا تخص قواعد SQLite
+    columns = kwargs.pop("columns", None)
+    sampling = {key: kwargs.pop(key) for key in ("sample_column", "exact_threshold") if key in kwargs}
+
+    results = {}
+    db_timings = {}
+    db_tables = {} if db_tables else None
+    db_perf = {} if instrument else None
+    db_results = run_all_db_many(db_paths, workers=workers, timings=db_timings,
+                                 tables=db_tables, perf=db_perf, trace_memory=trace_memory,
+                                 profile=db_profile, **kwargs)
+    for path, db_issues in zip(db_paths, db_results):
+        result = _new_result(path)
+        result["encoding"] = result["ext"].lstrip(".")
+        result["db_issues"] = db_issues
+        result["db_timings"] = db_timings.get(path, {})
+        result["perf"] = (db_perf or {}).get(path, [])
+        for suffix, issues in (db_tables or {}).get(path, {}).items():
+            result["issues"][f"{result['basename']} {suffix}"] = issues
+        results[path] = result
+
+    if workers <= 1 or len(file_paths) <= 1:
+        for path in file_paths:
+            results[path] = analyze_file(path, keep_df=keep_df, chunksize=chunksize,
+                                         instrument=instrument, trace_memory=trace_memory,
+                                         sample_rows=sample_rows, columns=columns, **sampling, **kwargs)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyze_file, path, keep_df, chunksize, instrument, trace_memory,
+                               sample_rows, columns=columns, **sampling, **kwargs) for path in file_paths]
+        for path, future in zip(file_paths, futures):
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                # العملية نفسها انهارت (مثلاً BrokenProcessPool)
+                result = _new_result(path)
+                result["error"] = f"{type(e).__name__}: {e}"
+                results[path] = result
+    return results
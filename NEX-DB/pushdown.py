@@ -0,0 +1,306 @@
+# pushdown.py
+"""
+فحص محتوى جداول SQLite داخل القاعدة نفسها بدل تحميلها في pandas.
+
+نفس فحوص analyzers.py (القيم الفارغة، الصفوف المكررة، القيم السالبة والصفرية،
+القيم الشاذة، الكلمات غير المقبولة) تُحسب كاستعلامات تجميع (SUM/COUNT/GROUP BY)
+تنفذها SQLite، ثم تُجلب فقط أرقام rowid للصفوف المخالفة على دفعات محدودة.
+"""
+import math
+import sqlite3
+from itertools import islice
+
+MAX_REFS = 10
+ROWID_BATCH = 1_000
+# SQLite تقبل 2000 عمود نتيجة في الاستعلام (SQLITE_MAX_COLUMN) و 6 عدادات لكل عمود في TableProfile،
+# و 999 معاملًا (?) في الإصدارات القديمة ومعاملين لكل عمود في outlier_checks
+COLUMN_BATCH = 300
+# حد عدد معاملات الدالة في الإصدارات القديمة (SQLITE_MAX_FUNCTION_ARG = 127)
+COALESCE_ARGS = 100
+DEFAULT_KEYWORDS = ["خطأ", "غير معروف", "n/a", "unknown", "NULL", "null", "#", "N/A", "NaT", "nat", "NAT", "?", "؟",
+                    "#DIV/0!", "#REF!", "#VALUE!", "#NAME?", "#NULL!", "#NUM!", "#N/A"]
+
+TABLE_CHECKS = []
+
+def register_table_check(func):
+    TABLE_CHECKS.append(func)
+    return func
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def pct(count: int, total: int) -> str:
+    return f"{int(count / total * 100)}%"
+
+def all_null(columns: list[str]) -> str:
+    """
+    شرط "كل الأعمدة فارغة" كـ COALESCE متداخلة بدل a IS NULL AND b IS NULL ...
+    حتى لا تتجاوز الجداول العريضة حد عمق التعبير في SQLite (1000).
+    """
+    exprs = [quote(col) for col in columns]
+    while len(exprs) > 1:
+        exprs = [f"COALESCE({', '.join(group)})" if len(group) > 1 else group[0]
+                 for group in (exprs[i:i + COALESCE_ARGS] for i in range(0, len(exprs), COALESCE_ARGS))]
+    return f"{exprs[0]} IS NULL"
+
+
+def iter_rowids(conn: sqlite3.Connection, table: str, where: str, params: tuple = (), batch: int = ROWID_BATCH):
+    """يرجع rowid للصفوف المخالفة على دفعات (keyset pagination) بدون تحميلها كلها."""
+    last = None
+    while True:
+        sql = f"SELECT rowid FROM {quote(table)} WHERE ({where})"
+        args = params
+        if last is not None:
+            sql += " AND rowid > ?"
+            args = params + (last,)
+        rows = conn.execute(sql + " ORDER BY rowid LIMIT ?", args + (batch,)).fetchall()
+        for (rowid,) in rows:
+            yield rowid
+        if len(rows) < batch:
+            return
+        last = rows[-1][0]
+
+
+def row_refs(conn: sqlite3.Connection, table: str, where: str, params: tuple = (), total: int = 0) -> str:
+    try:
+        refs = [f"rowid {r}" for r in islice(iter_rowids(conn, table, where, params, batch=MAX_REFS), MAX_REFS)]
+    except sqlite3.OperationalError:
+        # جداول WITHOUT ROWID لا تملك rowid
+        return "-"
+    return ", ".join(refs) + ("..." if total > MAX_REFS else "")
+
+
+class TableProfile:
+    """
+    نتيجة مسح الجدول: عدد الصفوف وعدادات كل عمود.
+    الأعمدة تُقسم على استعلامات من COLUMN_BATCH عمود (مسح واحد للجداول العادية).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, keywords: list[str]):
+        self.name = table
+        self.columns = [row[1] for row in conn.execute(f"PRAGMA table_info({quote(table)});")]
+        self.keywords = sorted({kw.lower() for kw in keywords})
+        keyword_list = ", ".join(literal(kw) for kw in self.keywords) or "NULL"
+
+        row = []
+        batches = [self.columns[i:i + COLUMN_BATCH] for i in range(0, len(self.columns), COLUMN_BATCH)] or [[]]
+        for b_idx, batch in enumerate(batches):
+            exprs = ["COUNT(*)", f"SUM({all_null(self.columns)})"] if b_idx == 0 else []
+            for col in batch:
+                q = quote(col)
+                exprs += [
+                    f"SUM({q} IS NULL)",
+                    f"SUM(typeof({q}) IN ('integer', 'real'))",
+                    f"SUM({q} < 0)",
+                    f"SUM({q} = 0)",
+                    f"TOTAL({q})",
+                    f"SUM(LOWER(CAST({q} AS TEXT)) IN ({keyword_list}))",
+                ]
+            row += conn.execute(f"SELECT {', '.join(exprs)} FROM {quote(table)};").fetchone()
+        row = [value or 0 for value in row]
+
+        self.n_rows = row[0]
+        self.missing_rows = row[1]
+        self.stats = {}
+        for i, col in enumerate(self.columns):
+            nulls, numeric, neg, zero, total, keyword = row[2 + 6 * i: 8 + 6 * i]
+            non_null = self.n_rows - nulls
+            self.stats[col] = {
+                "nulls": nulls,
+                # مثل pandas: العمود رقمي فقط إذا كانت كل قيمه غير الفارغة أرقامًا
+                "numeric": bool(non_null) and numeric == non_null,
+                "count": non_null,
+                "negative": neg,
+                "zero": zero,
+                "mean": total / non_null if non_null else None,
+                "keywords": keyword,
+            }
+
+
+@register_table_check
+def missing_checks(conn, table: TableProfile, **kwargs) -> list[dict]:
+    issues = []
+    n_rows = table.n_rows
+    for col in table.columns:
+        if table.stats[col]["nulls"] == n_rows:
+            issues.append({
+                "column": col,
+                "issue": "All values Missing On Column",
+                "count": n_rows,
+                "pct": "100%",
+                "details": "Column is Empty",
+                "rows": "-"
+            })
+    if table.missing_rows:
+        where = all_null(table.columns)
+        issues.append({
+            "column": "ALL",
+            "issue": "Missing Row",
+            "count": table.missing_rows,
+            "pct": pct(table.missing_rows, n_rows),
+            "details": "entire rows missing",
+            "rows": row_refs(conn, table.name, where, total=table.missing_rows)
+        })
+    for col in table.columns:
+        nulls = table.stats[col]["nulls"]
+        if nulls:
+            issues.append({
+                "column": col,
+                "issue": "Missing values",
+                "count": nulls,
+                "pct": f"{(nulls / n_rows * 100):.2f}%",
+                "details": "Null values or Excel Error",
+                "rows": row_refs(conn, table.name, f"{quote(col)} IS NULL", total=nulls)
+            })
+    return issues
+
+
+@register_table_check
+def duplicate_checks(conn, table: TableProfile, **kwargs) -> list[dict]:
+    cols = ", ".join(quote(col) for col in table.columns)
+    name = quote(table.name)
+    # GROUP BY يعامل NULL كقيم متساوية مثل df.duplicated()
+    dup_count = conn.execute(
+        f"SELECT TOTAL(n) FROM (SELECT COUNT(*) AS n FROM {name} GROUP BY {cols} HAVING COUNT(*) > 1);"
+    ).fetchone()[0]
+    dup_count = int(dup_count)
+    if not dup_count:
+        return []
+    try:
+        rowids = conn.execute(
+            f"SELECT rowid FROM (SELECT rowid, COUNT(*) OVER (PARTITION BY {cols}) AS n FROM {name}) "
+            f"WHERE n > 1 ORDER BY rowid LIMIT ?;", (MAX_REFS,)
+        ).fetchall()
+        rows = ", ".join(f"rowid {r}" for (r,) in rowids) + ("..." if dup_count > MAX_REFS else "")
+    except sqlite3.OperationalError:
+        rows = "-"
+    return [{
+        "column": "ALL",
+        "issue": "Full Duplicate Rows",
+        "count": dup_count,
+        "pct": pct(dup_count, table.n_rows),
+        "details": "identical rows",
+        "rows": rows
+    }]
+
+
+@register_table_check
+def invalid_value_checks(conn, table: TableProfile, **kwargs) -> list[dict]:
+    issues = []
+    for col in table.columns:
+        stats = table.stats[col]
+        if not stats["numeric"]:
+            continue
+        q = quote(col)
+        for key, where, issue, details in (
+            ("negative", f"{q} < 0", "Negative Values", "negative not allowed"),
+            ("zero", f"{q} = 0", "Zero Values", "zero may be invalid"),
+        ):
+            count = stats[key]
+            if count:
+                issues.append({
+                    "column": col,
+                    "issue": issue,
+                    "count": count,
+                    "pct": pct(count, table.n_rows),
+                    "details": details,
+                    "rows": row_refs(conn, table.name, where, total=count)
+                })
+    return issues
+
+
+@register_table_check
+def outlier_checks(conn, table: TableProfile, **kwargs) -> list[dict]:
+    numeric = [col for col in table.columns
+               if table.stats[col]["numeric"] and table.stats[col]["count"] > 1]
+    if not numeric:
+        return []
+    name = quote(table.name)
+    batches = [numeric[i:i + COLUMN_BATCH] for i in range(0, len(numeric), COLUMN_BATCH)]
+    # مسح ثانٍ لمجموع مربعات الانحراف عن المتوسط (أدق من مجموع المربعات مباشرة)
+    squares = []
+    for batch in batches:
+        exprs = [f"TOTAL(({quote(col)} - ?) * ({quote(col)} - ?))" for col in batch]
+        params = tuple(p for col in batch for p in (table.stats[col]["mean"],) * 2)
+        squares += conn.execute(f"SELECT {', '.join(exprs)} FROM {name};", params).fetchone()
+
+    bounds = {}
+    for col, ss in zip(numeric, squares):
+        mean = table.stats[col]["mean"]
+        std = math.sqrt(ss / (table.stats[col]["count"] - 1))
+        bounds[col] = (mean - 3 * std, mean + 3 * std)
+    counts = []
+    for batch in batches:
+        exprs = [f"SUM({quote(col)} < ? OR {quote(col)} > ?)" for col in batch]
+        params = tuple(b for col in batch for b in bounds[col])
+        counts += conn.execute(f"SELECT {', '.join(exprs)} FROM {name};", params).fetchone()
+
+    issues = []
+    for col, count in zip(numeric, counts):
+        if count:
+            low, high = bounds[col]
+            issues.append({
+                "column": col,
+                "issue": "Outliers",
+                "count": count,
+                "pct": pct(count, table.n_rows),
+                "details": f"outside ±3σ (mean={table.stats[col]['mean']:.2f})",
+                "rows": row_refs(conn, table.name, f"{quote(col)} < ? OR {quote(col)} > ?",
+                                 (low, high), total=count)
+            })
+    return issues
+
+
+@register_table_check
+def keyword_checks(conn, table: TableProfile, **kwargs) -> list[dict]:
+    issues = []
+    keyword_list = ", ".join(literal(kw) for kw in table.keywords)
+    for col in table.columns:
+        count = table.stats[col]["keywords"]
+        if not count:
+            continue
+        where = f"LOWER(CAST({quote(col)} AS TEXT)) IN ({keyword_list})"
+        matched = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT LOWER(CAST({quote(col)} AS TEXT)) FROM {quote(table.name)} WHERE {where};"
+        )]
+        issues.append({
+            "column": col,
+            "issue": "Found Unacceptable Keyword",
+            "count": count,
+            "pct": f"{(count / table.n_rows * 100):.2f}%",
+            "details": f"Found keywords: {', '.join(sorted(set(matched)))}",
+            "rows": row_refs(conn, table.name, where, total=count)
+        })
+    return issues
+
+
+def run_pushdown(session, **kwargs) -> dict[str, list[dict]]:
+    """
+    يشغّل كل فحوص TABLE_CHECKS على كل جدول في القاعدة عبر اتصال الجلسة (DBSession).
+    يُرجع {"(table)": issues} بنفس مفاتيح loaders.load_sqlite.
+    """
+    keywords = kwargs.get("keywords", DEFAULT_KEYWORDS)
+    results = {}
+    for table, _ in session.tables():
+        if table.startswith("sqlite_"):
+            continue
+        try:
+            table_profile = TableProfile(session.conn, table, keywords)
+            issues = []
+            if table_profile.n_rows and table_profile.columns:
+                for check in TABLE_CHECKS:
+                    issues.extend(check(session.conn, table_profile, **kwargs))
+        except sqlite3.Error as e:
+            issues = [{
+                "column": "ALL",
+                "issue": "Table Could Not Be Analyzed",
+                "count": 0,
+                "pct": "-",
+                "details": f"{type(e).__name__}: {e}",
+                "rows": "-"
+            }]
+        results[f"({table})"] = issues
+    return results
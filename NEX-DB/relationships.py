@@ -1,13 +1,59 @@
 # relationships.py
+from collections import Counter, defaultdict
 from difflib import SequenceMatcher
 from openpyxl import load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+import numpy as np
 import pandas as pd
+from sketches import sketch_dataframe
 
 def compute_similarity(a: str, b: str) -> float:
 
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
+def name_tokens(name: str) -> list[tuple]:
+    """حروف الاسم كـ (حرف، رقم تكراره في الاسم)، فعدد الـ tokens المشتركة بين اسمين = عدد الحروف المشتركة."""
+    seen = Counter()
+    tokens = []
+    for ch in name:
+        seen[ch] += 1
+        tokens.append((ch, seen[ch]))
+    return tokens
+
+def build_name_index(file_dfs: dict[str, pd.DataFrame]) -> dict:
+    """
+    inverted index لأسماء أعمدة كل الملفات (بعد lower): كل token من name_tokens
+    يشير (posting list) إلى أرقام الأعمدة التي تحتويه.
+    """
+    entries = []
+    postings = defaultdict(list)
+    for file, df in file_dfs.items():
+        for col in df.columns:
+            name = col.lower()
+            for token in name_tokens(name):
+                postings[token].append(len(entries))
+            entries.append((file, col, name))
+    return {
+        "entries":  entries,
+        "lengths":  np.array([len(name) for _, _, name in entries], dtype=np.int64),
+        "postings": {token: np.array(ids, dtype=np.int64) for token, ids in postings.items()}
+    }
+
+def candidate_columns(index: dict, name: str, threshold: float) -> list[tuple]:
+    """
+    يُرجع الأعمدة التي قد تصل نسبة تشابهها إلى threshold فقط، بترتيب الملفات والأعمدة.
+    ratio = 2*M/T و M لا تتجاوز عدد الحروف المشتركة (يُعد من الـ posting lists)،
+    لذلك هذا الفلتر لا يُسقط أي زوج كان سيتجاوز الحد.
+    """
+    entries = index["entries"]
+    if threshold > 1 or not entries:
+        return []
+    lists = [index["postings"][token] for token in name_tokens(name) if token in index["postings"]]
+    common = np.bincount(np.concatenate(lists), minlength=len(entries)) if lists else np.zeros(len(entries))
+    total = len(name) + index["lengths"]
+    keep = (total == 0) | (2.0 * common / np.maximum(total, 1) >= threshold)
+    return [entries[i] for i in np.flatnonzero(keep)]
+
 def compute_relationships(
     file_dfs: dict[str, pd.DataFrame],
     central_files: list[str],
@@ -21,24 +67,100 @@ def compute_relationships(
     for m in missing:
         print(f"⚠️ Warning: central key file '{m}' not found—skipping it.")
 
+    index = build_name_index(file_dfs) if existing else None
+    scores = {}
     for file_a in existing:
         cols_a = file_dfs[file_a].columns
         for col_a in cols_a:
-            for file_b, df_b in file_dfs.items():
+            name_a = col_a.lower()
+            for file_b, col_b, name_b in candidate_columns(index, name_a, threshold):
                 if file_b == file_a:
                     continue
-                for col_b in df_b.columns:
-                    sim = compute_similarity(col_a, col_b)
-                    if sim >= threshold:
-                        relationships.append({
-                            "file_a":   file_a,
-                            "column_a": col_a,
-                            "file_b":   file_b,
-                            "column_b": col_b,
-                            "rating":   f"{sim * 100:.2f}%"
-                        })
+                if (name_a, name_b) not in scores:
+                    scores[(name_a, name_b)] = SequenceMatcher(None, name_a, name_b).ratio()
+                sim = scores[(name_a, name_b)]
+                if sim >= threshold:
+                    relationships.append({
+                        "file_a":   file_a,
+                        "column_a": col_a,
+                        "file_b":   file_b,
+                        "column_b": col_b,
+                        "rating":   f"{sim * 100:.2f}%"
+                    })
     return relationships
 
+def compute_value_relationships(
+    file_dfs: dict[str, pd.DataFrame],
+    central_files: list[str] = None,
+    min_inclusion: float = 0.9,
+    key_uniqueness: float = 0.95,
+    min_distinct: int = 10,
+    sketches: dict = None,
+    min_shared: int = 10
+) -> list[dict]:
+    """
+    يكتشف المفاتيح الأجنبية من القيم: عمود شبه فريد (مفتاح) في ملف، وعمود في ملف آخر
+    معظم قيمه موجودة داخل المفتاح. كل عمود يُلخَّص مرة واحدة (sketches.py)، ثم تُبحث
+    عينة كل عمود (bottom-k) داخل قيم كل المفاتيح دفعة واحدة، مرتبة تنازليًا حسب نسبة الاحتواء المقدرة.
+    لا تُقبل علاقة إلا إذا اشتركت فيها min_shared قيمة على الأقل من العينة.
+    """
+    sketches = dict(sketches or {})
+    for name, df in file_dfs.items():
+        if name not in sketches:
+            sketches[name] = sketch_dataframe(df, key_uniqueness=key_uniqueness)
+
+    if central_files:
+        key_files = [f for f in central_files if f in sketches]
+    else:
+        key_files = list(sketches)
+
+    keys = []
+    for file_a in key_files:
+        for col_a, sk in sketches[file_a].items():
+            if sk.is_key and sk.distinct() >= min_distinct and sk.uniqueness() >= key_uniqueness:
+                keys.append((file_a, col_a, sk))
+
+    # كل قيم المفاتيح في مصفوفة واحدة مرتبة، مع رقم المفتاح الذي تنتمي له كل قيمة
+    if keys:
+        all_hashes = np.concatenate([sk.hashes for _, _, sk in keys])
+        owners = np.repeat(np.arange(len(keys)), [len(sk.hashes) for _, _, sk in keys])
+        order = np.argsort(all_hashes, kind="stable")
+        all_hashes, owners = all_hashes[order], owners[order]
+
+    found = []
+    for file_b, columns in sketches.items():
+        for col_b, sk_b in columns.items():
+            distinct_b = sk_b.distinct()
+            if distinct_b < min_distinct or not keys:
+                continue
+            sample = sk_b.minhash.values
+            lo = np.searchsorted(all_hashes, sample, side="left")
+            hi = np.searchsorted(all_hashes, sample, side="right")
+            # نفس القيمة قد توجد في أكثر من مفتاح، فكل قيمة من العينة تطابق نطاقًا [lo, hi)
+            counts = hi - lo
+            starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+            hits = owners[starts + np.arange(counts.sum())]
+            candidates = np.bincount(hits, minlength=len(keys))
+            for key_id in np.flatnonzero(candidates >= min(min_shared, len(sample))):
+                file_a, col_a, sk_a = keys[key_id]
+                if file_a == file_b or sk_a.distinct() < min_inclusion * distinct_b:
+                    continue
+                inclusion, _ = sk_b.minhash.containment(sk_a.hashes)
+                if inclusion >= min_inclusion:
+                    found.append((inclusion, file_a, col_a, file_b, col_b))
+
+    found.sort(key=lambda rec: -rec[0])
+    return [
+        {
+            "file_a":   file_a,
+            "column_a": col_a,
+            "file_b":   file_b,
+            "column_b": col_b,
+            "rating":   f"{inclusion * 100:.2f}%"
+        }
+        for inclusion, file_a, col_a, file_b, col_b in found
+    ]
+
 def add_relationships_to_report(report_path: str, relationships: list[dict]):
 
     wb = load_workbook(report_path)
@@ -1,7 +1,7 @@
 # report.py
-import pandas as pd
-from openpyxl import load_workbook
 import math
+import xlsxwriter
+from loaders import load_xlsx_metadata
 
 def format_time(seconds: float) -> str:
     if seconds < 60:
@@ -22,23 +22,56 @@ def map_format_to_type(fmt: str) -> str:
     return 'text'
 
 def extract_column_types_from_excel(path: str) -> dict:
-    from openpyxl import load_workbook as _load
-    wb = _load(path, data_only=True)
-    sheet = wb[wb.sheetnames[0]]
-    headers = [cell.value for cell in sheet[1]]
+    meta = load_xlsx_metadata(path)
     types = {}
-    for idx, header in enumerate(headers):
-        fmt = sheet.cell(row=2, column=idx+1).number_format or "General"
+    for header, fmt in zip(meta["headers"], meta["number_formats"]):
         types[header] = map_format_to_type(fmt)
     return types
 
+ISSUE_SEVERITY = {
+    "Start date is after end date":       "red",
+    "Zero quantity with non-zero price":  "red",
+    "Currency mismatch":                  "red",
+    "Male gender with female name":       "red",
+    "Mixed Data Types":                   "red",
+    "Invalid Date Format":                "red",
+    "Outliers":                           "green",
+    "Negative Values":                    "green",
+    "Zero Values":                        "green",
+    "Full Duplicate Rows":                "green",
+    "Column Value Match":                 "green",
+    "There Are Some Columns Match":       "green",
+    "Mostly Empty Column":                "yellow",
+    "Time Repetition Error":              "yellow",
+    "All values Missing On Column":       "yellow",
+    "Missing Row":                        "yellow",
+    "Missing values":                     "orange",
+    "There Are Symbols In Cells":         "orange",
+    "Found Unacceptable Keyword":         "orange"
+}
+
+SEVERITY_COLORS = {
+    "red":    "#D23B3B",
+    "green":  "#00FF11",
+    "yellow": "#FFEE00",
+    "orange": "#FF7700"
+}
+
+ISSUE_COLUMNS = ["column", "type", "issue", "count", "pct", "details", "rows"]
+
+def clean_value(val, empty: str):
+    if val is None or (isinstance(val, float) and (math.isnan(val) or math.isinf(val))):
+        return empty
+    return val
+
 def create_report(all_issues: dict,
                   time_stats: dict,
                   file_encodings: dict,
                   file_paths: dict,
-                  output_path: str):
-    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-        workbook = writer.book
+                  output_path: str,
+                  performance: list[dict] = None):
+    # constant_memory: كل صف يُكتب مرة واحدة بالترتيب ثم يُفرَّغ من الذاكرة
+    with xlsxwriter.Workbook(output_path, {"constant_memory": True}) as workbook:
 
         header_fmt = workbook.add_format({
             'bold': True,
@@ -53,80 +86,27 @@ def create_report(all_issues: dict,
             'right': 2
         })
 
-        body_format_odd = workbook.add_format({
-            'font_color': 'white', 'bg_color': '#403151',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-        body_format_even = workbook.add_format({
-            'font_color': 'white', 'bg_color': '#262626',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-
-        center_format_odd = workbook.add_format({
-            'font_color': 'white', 'bg_color': '#403151',
-            'font_size': 14, 'align': 'center', 'valign': 'vcenter'
-        })
-        center_format_even = workbook.add_format({
-            'font_color': 'white', 'bg_color': '#262626',
-            'font_size': 14, 'align': 'center', 'valign': 'vcenter'
-        })
-
-        red_body_odd = workbook.add_format({
-            'font_color': '#D23B3B', 'bg_color': '#403151',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-        red_body_even = workbook.add_format({
-            'font_color': '#D23B3B', 'bg_color': '#262626',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-
-        green_body_odd = workbook.add_format({
-            'font_color': '#00FF11', 'bg_color': '#403151',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-        green_body_even = workbook.add_format({
-            'font_color': '#00FF11', 'bg_color': '#262626',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-
-        yellow_body_odd = workbook.add_format({
-            'font_color': '#FFEE00', 'bg_color': '#403151',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-        yellow_body_even = workbook.add_format({
-            'font_color': '#FFEE00', 'bg_color': '#262626',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-
-        orange_body_odd = workbook.add_format({
-            'font_color': '#FF7700', 'bg_color': '#403151',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
-        orange_body_even = workbook.add_format({
-            'font_color': '#FF7700', 'bg_color': '#262626',
-            'font_size': 14, 'align': 'left', 'valign': 'vcenter'
-        })
+        # (لون الخط، زوجي/فردي، المحاذاة) -> format
+        formats = {}
+        for color in ['white'] + list(SEVERITY_COLORS):
+            font_color = SEVERITY_COLORS.get(color, 'white')
+            for is_even, bg_color in ((False, '#403151'), (True, '#262626')):
+                for align in ('left', 'center'):
+                    formats[(color, is_even, align)] = workbook.add_format({
+                        'font_color': font_color, 'bg_color': bg_color,
+                        'font_size': 14, 'align': align, 'valign': 'vcenter'
+                    })
 
         files_list = [key.split("(")[0].strip() for key in all_issues.keys()]
-        encodings  = [file_encodings.get(f, '') for f in files_list]
-        summary_df = pd.DataFrame({
-            "Files Analyzed": files_list,
-            "Encoding": encodings
-        })
-        summary_df.loc[0, "Analysis Time"] = format_time(time_stats.get("elapsed_s", 0))
-        summary_df.to_excel(writer, sheet_name="Summary", index=False)
-        ws_sum = writer.sheets["Summary"]
-
-        for col_idx, col_name in enumerate(summary_df.columns):
-            ws_sum.write(0, col_idx, col_name, header_fmt)
-            ws_sum.set_column(col_idx, col_idx, pixels_to_excel_width(200))
-        for row in range(1, len(summary_df) + 1):
-            fmt = body_format_odd if row % 2 == 0 else body_format_even
-            for col_idx in range(len(summary_df.columns)):
-                val = summary_df.iloc[row - 1, col_idx]
-                if val is None or (isinstance(val, float) and (math.isnan(val) or math.isinf(val))):
-                    val = ""
-                ws_sum.write(row, col_idx, val, fmt)
+        summary_rows = [[f, file_encodings.get(f, ''), ""] for f in files_list] or [["", "", ""]]
+        summary_rows[0][2] = format_time(time_stats.get("elapsed_s", 0))
+
+        ws_sum = workbook.add_worksheet("Summary")
+        ws_sum.set_column(0, 2, pixels_to_excel_width(200))
+        ws_sum.write_row(0, 0, ["Files Analyzed", "Encoding", "Analysis Time"], header_fmt)
+        for row, values in enumerate(summary_rows, start=1):
+            fmt = formats[('white', row % 2 != 0, 'left')]
+            ws_sum.write_row(row, 0, [clean_value(v, "") for v in values], fmt)
 
         column_headers = {
             "column": "Column",
@@ -137,63 +117,48 @@ def create_report(all_issues: dict,
             "details":"Details",
             "rows":   "Rows"
         }
+        widths = {
+            "column": 211, "type": 137, "issue": 394,
+            "count": 117, "pct": 140, "details": 318,
+            "rows": 580
+        }
 
         for file_key, issues in all_issues.items():
-            df_iss = pd.DataFrame(issues)[["column", "issue", "count", "pct", "details", "rows"]]
-
             basename = file_key.split()[0]
             path     = file_paths.get(basename, "")
             if path.lower().endswith('.xlsx'):
                 col_types = extract_column_types_from_excel(path)
             else:
-                col_types = {col: "text" for col in df_iss["column"].unique()}
-
-            df_iss.insert(
-                loc=df_iss.columns.get_loc("issue"),
-                column="type",
-                value=[col_types.get(col_name, "") for col_name in df_iss["column"]]
-            )
-
-            sheet_name = file_key[:31]
-            df_iss.to_excel(writer, sheet_name=sheet_name, index=False)
-            ws = writer.sheets[sheet_name]
-
-            widths = {
-                "column": 211, "type": 137, "issue": 394,
-                "count": 117, "pct": 140, "details": 318,
-                "rows": 580
-            }
-            for idx, col in enumerate(df_iss.columns):
+                col_types = {issue.get("column"): "text" for issue in issues}
+
+            ws = workbook.add_worksheet(file_key[:31])
+            for idx, col in enumerate(ISSUE_COLUMNS):
                 ws.set_column(idx, idx, pixels_to_excel_width(widths[col]))
-                ws.write(0, idx, column_headers[col], header_fmt)
+            ws.write_row(0, 0, [column_headers[col] for col in ISSUE_COLUMNS], header_fmt)
 
-            centered_cols = {"count", "pct", "type"}
-            for row in range(1, len(df_iss) + 1):
+            for row, issue in enumerate(issues, start=1):
+                is_even = (row % 2 == 0)
+                issue_text = clean_value(issue.get("issue"), "N/A")
+                values = [clean_value(issue.get(col), "N/A") for col in ("column", "count", "pct", "details", "rows")]
+                body   = formats[('white', is_even, 'left')]
+                center = formats[('white', is_even, 'center')]
+                color  = formats[(ISSUE_SEVERITY.get(issue_text, 'white'), is_even, 'left')]
+
+                ws.write(row, 0, values[0], body)
+                ws.write(row, 1, clean_value(col_types.get(issue.get("column"), ""), "N/A"), center)
+                ws.write(row, 2, issue_text, color)
+                ws.write_row(row, 3, values[1:3], center)
+                ws.write_row(row, 5, values[3:5], body)
+
+        if performance:
+            ws_perf = workbook.add_worksheet("Performance")
+            ws_perf.set_column(0, 2, pixels_to_excel_width(300))
+            ws_perf.set_column(3, 5, pixels_to_excel_width(140))
+            ws_perf.write_row(0, 0, ["File", "Stage", "Name", "Wall (s)", "CPU (s)", "Peak MB"], header_fmt)
+            # الأبطأ أولًا
+            records = sorted(performance, key=lambda r: r["wall_s"], reverse=True)
+            for row, rec in enumerate(records, start=1):
                 is_even = (row % 2 == 0)
-                for idx, col in enumerate(df_iss.columns):
-                    val = df_iss.iloc[row - 1, idx]
-                    if val is None or (isinstance(val, float) and (math.isnan(val) or math.isinf(val))):
-                        val = "N/A"
-                    
-                    if col in centered_cols:
-                        base_fmt = center_format_even if is_even else center_format_odd
-                    else:
-                        base_fmt = body_format_even if is_even else body_format_odd
-
-                    if col == "issue":
-                        if val == "Start date is after end date" or val=="Zero quantity with non-zero price"  or val=="Currency mismatch"  or val=="Male gender with female name"  or val=="Mixed Data Types"  or val=="Invalid Date Format":
-                            fmt = red_body_even if is_even else red_body_odd
-                        elif val == "Outliers"  or val=="Negative Values"  or val=="Zero Values"  or val=="Full Duplicate Rows"  or val=="Column Value Match"  or val=="There Are Some Columns Match":
-                            fmt = green_body_even if is_even else green_body_odd
-                        elif val == "Mostly Empty Column"  or val=="Time Repetition Error"  or val=="All values Missing On Column"  or val=="Missing Row":
-                            fmt = yellow_body_even if is_even else yellow_body_odd
-                        elif val == "Missing values"  or val=="There Are Symbols In Cells"  or val=="Found Unacceptable Keyword":
-                            fmt = orange_body_even if is_even else orange_body_odd
-                        else:
-                            fmt = base_fmt
-                    else:
-                        fmt = base_fmt
-
-
-
-                    ws.write(row, idx, val, fmt)
+                ws_perf.write_row(row, 0, [rec["file"], rec["stage"], rec["name"]], formats[('white', is_even, 'left')])
+                ws_perf.write_row(row, 3, [clean_value(rec.get(k), "N/A") for k in ("wall_s", "cpu_s", "peak_mb")],
+                                  formats[('white', is_even, 'center')])
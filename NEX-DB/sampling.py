@@ -0,0 +1,193 @@
+# sampling.py
+"""
+وضع العينة للملفات الضخمة: تحليل عينة (uniform أو stratified أو reservoir أثناء القراءة)
+ثم تقدير العدد والنسبة لكل خطأ في الملف كله مع فترة ثقة (Wilson + تصحيح المجتمع المحدود).
+
+الأعمدة التي تتجاوز نسبة الخطأ المقدرة فيها exact_threshold يُعاد تحليلها بدقة على كل الصفوف.
+"""
+import math
+import re
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from analyzers import run_all
+from loaders import load_csv_chunks
+from sketches import update_sketches
+
+# الصفوف المكررة وأخطاء الترتيب الزمني تعتمد على أزواج صفوف، فما يظهر في العينة حد أدنى فقط
+LOWER_BOUND_ISSUES = {"Full Duplicate Rows", "Near Duplicate Rows", "Duplicate Key Values", "Time Repetition Error"}
+STRUCTURAL_ISSUES = {"There Are Some Columns Match"}
+# أخطاء تعتمد على عمود واحد فقط، فالتحليل الدقيق لهذا العمود وحده يغني عن التقدير
+SINGLE_COLUMN_ISSUES = {
+    "All values Missing On Column", "Negative Values", "Zero Values", "Outliers",
+    "Mixed Data Types", "Mostly Empty Column", "Time Repetition Error", "Missing values",
+    "Found Unacceptable Keyword", "Invalid Date Format", "There Are Symbols In Cells",
+}
+REF_RE = re.compile(r'\b(Row |[A-Z]{1,3})(\d+)\b')
+
+
+def col_letters(idx: int) -> str:
+    letters = ""
+    while idx >= 0:
+        idx, remainder = divmod(idx, 26)
+        letters = chr(65 + remainder) + letters
+        idx -= 1
+    return letters
+
+
+def col_index(letters: str) -> int:
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+def remap_refs(rows, row_index=None, col_index_map=None):
+    """
+    يحوّل مراجع الخلايا (A12, Row 12) من ترقيم العينة إلى ترقيم الملف الأصلي.
+    row_index[i] = رقم الصف الأصلي لصف العينة i، و col_index_map[j] = رقم العمود الأصلي.
+    """
+    if not isinstance(rows, str):
+        return rows
+
+    def repl(m):
+        prefix, row = m.group(1), int(m.group(2)) - 2
+        if row_index is not None:
+            if not 0 <= row < len(row_index):
+                return m.group(0)
+            row = int(row_index[row])
+        if prefix != "Row " and col_index_map is not None:
+            col = col_index(prefix)
+            if col < len(col_index_map):
+                prefix = col_letters(col_index_map[col])
+        return f"{prefix}{row + 2}"
+
+    return REF_RE.sub(repl, rows)
+
+
+def uniform_sample(df: pd.DataFrame, n: int, seed: int = 0) -> pd.DataFrame:
+    if len(df) <= n:
+        return df
+    return df.sample(n=n, random_state=seed).sort_index()
+
+
+def stratified_sample(df: pd.DataFrame, column: str, n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    توزيع نسبي على قيم column بحجم n بالضبط (أكبر الكسور تأخذ الصفوف الباقية).
+    كل مجموعة تأخذ نفس نسبة صفوفها تقريبًا، فالعينة تُقدَّر كعينة uniform بدون أوزان؛
+    المجموعات الصغيرة جدًا قد لا يظهر منها أي صف.
+    """
+    if len(df) <= n:
+        return df
+    groups = df.groupby(column, dropna=False, sort=False)
+    sizes = groups.size().to_numpy()
+    quota = sizes * n / len(df)
+    alloc = np.floor(quota).astype(int)
+    alloc[np.argsort(alloc - quota, kind="stable")[:n - alloc.sum()]] += 1
+    parts = [group.sample(n=k, random_state=seed)
+             for (_, group), k in zip(groups, alloc) if k]
+    return pd.concat(parts).sort_index()
+
+
+def reservoir_sample_csv(path: str, n: int, chunksize: int = 100_000, seed: int = 0, sketches: dict = None):
+    """
+    عينة uniform بحجم n أثناء قراءة CSV على دفعات بدون تحميل الملف كله:
+    كل صف يأخذ مفتاحًا عشوائيًا ونحتفظ بأصغر n مفتاح.
+    sketches: dict تُضاف إليه ملخصات أعمدة الملف كله أثناء نفس القراءة (sketches.update_sketches).
+    يُرجع: العينة (index = رقم الصف في الملف)، عدد صفوف الملف، الترميز.
+    """
+    rng = np.random.default_rng(seed)
+    chunks, encoding = load_csv_chunks(path, chunksize)
+    kept, keys, total = None, None, 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(total, total + len(chunk))
+        total += len(chunk)
+        if sketches is not None:
+            update_sketches(sketches, chunk)
+        chunk_keys = rng.random(len(chunk))
+        if kept is None:
+            kept, keys = chunk, chunk_keys
+        else:
+            kept, keys = pd.concat([kept, chunk]), np.concatenate([keys, chunk_keys])
+        if len(kept) > n:
+            top = np.argpartition(keys, n - 1)[:n]
+            kept, keys = kept.iloc[top], keys[top]
+    encoding = chunks.encoding
+    if kept is None:
+        return pd.DataFrame(), 0, encoding
+    return kept.sort_index(), total, encoding
+
+
+def proportion_ci(x: int, n: int, population: int, confidence: float = 0.95) -> tuple[float, float]:
+    """فترة Wilson لنسبة x/n مع تصحيح المجتمع المحدود (العينة تغطي الملف كله -> بدون هامش)."""
+    p = x / n
+    if n >= population:
+        return p, p
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    margin *= math.sqrt((population - n) / (population - 1))
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def estimate_issue(issue: dict, n: int, population: int, confidence: float, row_index) -> dict:
+    issue = dict(issue)
+    issue["rows"] = remap_refs(issue.get("rows"), row_index)
+    name = issue.get("issue")
+    count = issue.get("count")
+    if name in STRUCTURAL_ISSUES or not isinstance(count, (int, np.integer)):
+        return issue
+    if name in LOWER_BOUND_ISSUES:
+        issue["details"] = f"{issue.get('details', '')} [at least; found in a {n}-row sample of {population}]"
+        issue["estimated"] = "lower bound"
+        return issue
+    low, high = proportion_ci(count, n, population, confidence)
+    p = count / n
+    issue["count"] = int(round(p * population))
+    issue["pct"] = f"~{p * 100:.2f}% ({int(confidence * 100)}% CI {low * 100:.2f}-{high * 100:.2f}%)"
+    issue["details"] = f"{issue.get('details', '')} [estimated from {n} of {population} rows]"
+    issue["ci"] = (int(low * population), int(math.ceil(high * population)))
+    issue["estimated"] = True
+    return issue
+
+
+def run_sampled(sample: pd.DataFrame, population: int, confidence: float = 0.95,
+                exact=None, exact_threshold: float = None, **kwargs) -> list[dict]:
+    """
+    sample: العينة و index = رقم الصف في الملف الأصلي.
+    exact: الـ DataFrame الكامل أو دالة(columns) -> DataFrame للأعمدة المطلوبة فقط.
+    exact_threshold: نسبة (مثلاً 0.01) إذا تجاوزتها النسبة المقدرة لعمود يُعاد تحليله بدقة.
+    """
+    row_index = sample.index.to_numpy()
+    work = sample.reset_index(drop=True)
+    n = len(work)
+    if n >= population:
+        # العينة هي الملف كله، فالنتائج دقيقة بالفعل
+        return run_all(work, **kwargs)
+    issues = [estimate_issue(issue, n, population, confidence, row_index) for issue in run_all(work, **kwargs)]
+    if exact is None or exact_threshold is None or not n:
+        return issues
+
+    flagged = [col for col in dict.fromkeys(
+        issue["column"] for issue in issues
+        if issue.get("estimated") is True and issue["count"] / population >= exact_threshold
+    ) if col in sample.columns]
+    if not flagged:
+        return issues
+
+    # حدود Outliers داخل المجموعات تحتاج عمود المجموعة أيضًا
+    group = kwargs.get("outlier_group")
+    columns = flagged + [group] if group in sample.columns and group not in flagged else flagged
+    full = exact(columns) if callable(exact) else exact[columns]
+    col_map = [sample.columns.get_loc(col) for col in full.columns]
+    exact_issues = []
+    for issue in run_all(full, **kwargs):
+        if issue.get("column") in flagged:
+            issue["rows"] = remap_refs(issue.get("rows"), col_index_map=col_map)
+            exact_issues.append(issue)
+    exact_keys = {(issue["column"], issue["issue"]) for issue in exact_issues}
+    kept = [issue for issue in issues
+            if not (issue.get("column") in flagged
+                    and ((issue["column"], issue["issue"]) in exact_keys or issue["issue"] in SINGLE_COLUMN_ISSUES))]
+    return kept + exact_issues
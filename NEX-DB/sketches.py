@@ -0,0 +1,170 @@
+# sketches.py
+"""
+ملخصات (sketches) صغيرة وقابلة للدمج لقيم الأعمدة:
+HyperLogLog لتقدير عدد القيم المميزة، و MinHash بصيغة bottom-k كعينة من قيم العمود.
+
+نسبة احتواء عمود B داخل عمود A تُقدَّر من عينة B مقارنة بكل قيم A (hashes)، لا بعينة A:
+لو A أكبر من B بكثير فإن أصغر k قيمة في كل منهما لا تشترك إلا في قيمة أو اثنتين.
+لذلك تُحفظ كل قيم A فقط للأعمدة التي تصلح كمفاتيح (شبه فريدة)، وباقي الأعمدة ملخصها بحجم ثابت.
+"""
+import numpy as np
+import pandas as pd
+
+
+def hash_values(series: pd.Series) -> np.ndarray:
+    """
+    hash 64-bit لكل قيمة مميزة غير فارغة بعد توحيد شكلها،
+    حتى تتطابق 1 و 1.0 و "1" و " ABC " مع "abc" بين الجداول.
+    """
+    series = series.dropna()
+    if not len(series):
+        return np.empty(0, dtype=np.uint64)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = pd.Series(pd.unique(series.astype("float64")))
+        integral = (values % 1 == 0) & (values.abs() < 2 ** 53)
+        text = values.astype(str)
+        text[integral] = values[integral].astype("int64").astype(str)
+    else:
+        text = pd.Series(pd.unique(series.astype(str).str.strip().str.lower()))
+    return np.unique(pd.util.hash_array(text.to_numpy(dtype=object)))
+
+
+def bit_length(values: np.ndarray) -> np.ndarray:
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.uint64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= np.uint64(1 << shift)
+        values[mask] >>= np.uint64(shift)
+        lengths[mask] += np.uint64(shift)
+    lengths += (values > 0).astype(np.uint64)
+    return lengths
+
+
+class HyperLogLog:
+    """عدد القيم المميزة بخطأ تقريبي 1.04/sqrt(2**p)، والدمج = أكبر قيمة لكل سجل."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        if not len(hashes):
+            return
+        tail_bits = 64 - self.p
+        idx = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+        rank = (np.uint64(tail_bits + 1) - bit_length(tail)).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+    @property
+    def error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class MinHash:
+    """
+    bottom-k MinHash: أصغر k قيمة hash في العمود، أي عينة عشوائية منتظمة من قيمه المميزة
+    (الـ hash يرتب القيم عشوائيًا) تبقى نفسها مهما كان ترتيب الدفعات أو دمجها.
+    """
+
+    def __init__(self, k: int = 128):
+        self.k = k
+        self.values = np.empty(0, dtype=np.uint64)
+
+    def add(self, hashes: np.ndarray) -> None:
+        if len(hashes) > self.k:
+            hashes = np.partition(hashes, self.k - 1)[:self.k]
+        self.values = np.unique(np.concatenate([self.values, hashes]))[:self.k]
+
+    def merge(self, other: "MinHash") -> "MinHash":
+        self.add(other.values)
+        return self
+
+    def containment(self, hashes: np.ndarray) -> tuple[float, int]:
+        """
+        نسبة قيم self الموجودة في hashes (كل قيم العمود الآخر، مرتبة)، وعدد القيم المشتركة في العينة.
+        """
+        if not len(self.values):
+            return 0.0, 0
+        shared = int(np.isin(self.values, hashes, assume_unique=True).sum())
+        return shared / len(self.values), shared
+
+
+class ColumnSketch:
+    """
+    ملخص عمود بحجم ثابت: HyperLogLog لعدد القيم المميزة و MinHash (bottom-k) كعينة من قيمه.
+    hashes: كل قيم الـ hash المميزة (8 bytes لكل قيمة) تُحفظ فقط ما دام العمود يجتاز اختبار
+    المفتاح (uniqueness >= key_uniqueness) على ما رآه حتى الآن، لأن عينات الأعمدة الأخرى
+    تُقارن بكل قيم المفتاح؛ عند أول فشل تُحذف (None) ويكفي HyperLogLog.
+    """
+
+    def __init__(self, k: int = 128, p: int = 12, key_uniqueness: float = 0.95):
+        self.rows = 0
+        self.non_null = 0
+        self.key_uniqueness = key_uniqueness
+        self.hll = HyperLogLog(p)
+        self.minhash = MinHash(k)
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, series: pd.Series) -> None:
+        self.rows += len(series)
+        self.non_null += int(series.notna().sum())
+        hashes = hash_values(series)
+        self.hll.add(hashes)
+        self.minhash.add(hashes)
+        if self.hashes is not None:
+            # hash_values تُرجع قيمًا مميزة ومرتبة بالفعل
+            self.hashes = np.union1d(self.hashes, hashes) if len(self.hashes) else hashes
+        self.check_key()
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.rows += other.rows
+        self.non_null += other.non_null
+        self.hll.merge(other.hll)
+        self.minhash.merge(other.minhash)
+        if self.hashes is not None and other.hashes is not None:
+            self.hashes = np.union1d(self.hashes, other.hashes)
+        else:
+            self.hashes = None
+        self.check_key()
+        return self
+
+    def check_key(self) -> None:
+        if self.hashes is not None and self.uniqueness() < self.key_uniqueness:
+            self.hashes = None
+
+    @property
+    def is_key(self) -> bool:
+        return self.hashes is not None
+
+    def distinct(self) -> float:
+        return float(len(self.hashes)) if self.hashes is not None else self.hll.count()
+
+    def uniqueness(self) -> float:
+        return min(1.0, self.distinct() / self.non_null) if self.non_null else 0.0
+
+
+def update_sketches(sketches: dict, df: pd.DataFrame, k: int = 128, key_uniqueness: float = 0.95) -> dict:
+    """يضيف دفعة (chunk) إلى ملخصات أعمدتها، فيُلخَّص الملف كله أثناء قراءته على دفعات."""
+    for col in df.columns:
+        if col not in sketches:
+            sketches[col] = ColumnSketch(k, key_uniqueness=key_uniqueness)
+        sketches[col].update(df[col])
+    return sketches
+
+
+def sketch_dataframe(df: pd.DataFrame, k: int = 128, key_uniqueness: float = 0.95) -> dict:
+    return update_sketches({}, df, k, key_uniqueness)
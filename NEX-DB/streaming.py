@@ -0,0 +1,793 @@
+# streaming.py
+"""
+تحليل ملفات CSV الضخمة على دفعات (chunks) بذاكرة محدودة.
+
+كل محلل هنا يحتفظ بحالة جزئية صغيرة (عدادات، مدرج أنواع، متوسط وانحراف متراكم،
+مجموعة hashes، آخر قيمة) يتم تحديثها مع كل دفعة، ويمكن دمج حالتين متتاليتين
+بـ merge() ثم إخراج نفس شكل الأخطاء الذي تُرجعه analyzers.py عبر finalize().
+"""
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+from analyzers import (cell_ref, detect_and_parse_dates, CrossFieldValueAnalyzer, DecimalFormatAnalyzer,
+                       InvalidDateFormatAnalyzer, MixedTypeAnalyzer)
+from column_profile import FrameProfile, frame_profile
+from loaders import load_csv_chunks
+from outliers import get_detector, MAX_SKETCH_GROUPS, StreamState
+from sketches import update_sketches
+
+MAX_REFS = 10
+
+STREAM_ANALYZERS: list[type["BaseStreamAnalyzer"]] = []
+
+def register_stream(cls: type["BaseStreamAnalyzer"]) -> type["BaseStreamAnalyzer"]:
+    STREAM_ANALYZERS.append(cls)
+    return cls
+
+def join_refs(refs: list[str], total: int) -> str:
+    return ", ".join(refs[:MAX_REFS]) + ("..." if total > MAX_REFS else "")
+
+def add_refs(refs: list, new_refs) -> None:
+    if len(refs) < MAX_REFS:
+        refs.extend(list(new_refs)[:MAX_REFS - len(refs)])
+
+def excel_col(idx: int) -> str:
+    letters = ""
+    while idx >= 0:
+        idx, remainder = divmod(idx, 26)
+        letters = chr(65 + remainder) + letters
+        idx -= 1
+    return letters
+
+
+class BaseStreamAnalyzer(ABC):
+    """
+    update() تستقبل الدفعة ورقم أول صف فيها داخل الملف كله.
+    merge() تدمج حالة تغطي صفوفًا لاحقة (other تأتي بعد self).
+    المحللات التي تحتاج قراءة ثانية للملف تضبط passes = 2.
+    """
+    passes = 1
+
+    def __init__(self):
+        self.n_rows = 0
+        self.columns: list = []
+
+    def configure(self, **kwargs) -> None:
+        """خيارات التشغيل (نفس kwargs الخاصة بـ run_streaming) قبل أول قراءة؛ يمكنها تغيير passes."""
+        pass
+
+    def begin(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self.columns = list(chunk.columns)
+
+    @abstractmethod
+    def update(self, chunk: pd.DataFrame, start: int, pass_no: int = 0, **kwargs) -> None:
+        pass
+
+    @abstractmethod
+    def merge(self, other: "BaseStreamAnalyzer") -> "BaseStreamAnalyzer":
+        pass
+
+    def end_pass(self, pass_no: int) -> None:
+        pass
+
+    @abstractmethod
+    def finalize(self, **kwargs) -> list[dict]:
+        pass
+
+
+@register_stream
+class MissingDataStream(BaseStreamAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.null_counts: dict = {}
+        self.missing_rows = 0
+        self.missing_refs: list[int] = []
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        for col, cnt in chunk.isna().sum().items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(cnt)
+        full_missing = chunk.isna().all(axis=1).to_numpy()
+        self.missing_rows += int(full_missing.sum())
+        add_refs(self.missing_refs, start + np.flatnonzero(full_missing))
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for col, cnt in other.null_counts.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + cnt
+        self.missing_rows += other.missing_rows
+        add_refs(self.missing_refs, other.missing_refs)
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        n_cols = len(self.columns)
+        for col in self.columns:
+            if self.null_counts.get(col, 0) == self.n_rows:
+                issues.append({
+                    "column": col,
+                    "issue": "All values Missing On Column",
+                    "count": self.n_rows,
+                    "pct": "100%",
+                    "details": "Column is Empty",
+                    "rows": "-"
+                })
+        if self.missing_rows:
+            rows = [cell_ref(i, 0) + f":{cell_ref(i, n_cols-1)}" for i in self.missing_refs]
+            issues.append({
+                "column": "ALL",
+                "issue": "Missing Row",
+                "count": self.missing_rows,
+                "pct": f"{int(self.missing_rows/self.n_rows*100)}%",
+                "details": "entire rows missing",
+                "rows": join_refs(rows, self.missing_rows)
+            })
+        return issues
+
+
+def row_hashes(chunk: pd.DataFrame) -> np.ndarray:
+    # الأعمدة الرقمية تُوحَّد إلى float64 حتى لا يختلف الـ hash بين دفعة int ودفعة float
+    normalized = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_numeric_dtype(series):
+            normalized[col] = series.astype("float64")
+        else:
+            normalized[col] = series.astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy()
+
+
+def merge_runs(runs: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """يدمج عدة مجموعات (hashes مميزة، عدد تكرار كل منها) في مجموعة واحدة مرتبة."""
+    all_hashes = np.concatenate([hashes for hashes, _ in runs])
+    all_counts = np.concatenate([counts for _, counts in runs])
+    hashes, inverse = np.unique(all_hashes, return_inverse=True)
+    return hashes, np.bincount(inverse, weights=all_counts, minlength=len(hashes)).astype("int64")
+
+
+@register_stream
+class DuplicateDataStream(BaseStreamAnalyzer):
+    """
+    الـ hashes تُحفظ كمجموعات مرتبة (runs) بأحجام متزايدة: كل دفعة تضاف كمجموعة جديدة، وتُدمج
+    آخر مجموعتين فقط عندما تقترب أحجامهما (مثل LSM tree)، فكل hash يُعاد ترتيبه O(log N) مرة
+    بدل مرة مع كل دفعة.
+    """
+    passes = 2
+
+    def __init__(self):
+        super().__init__()
+        self.runs: list[tuple[np.ndarray, np.ndarray]] = []
+        self.dup_hashes = None
+        self.dup_count = 0
+        self.dup_refs: list[int] = []
+
+    def add_hashes(self, hashes: np.ndarray, counts: np.ndarray) -> None:
+        self.runs.append((hashes, counts))
+        while len(self.runs) > 1 and len(self.runs[-2][0]) <= 2 * len(self.runs[-1][0]):
+            self.runs[-2:] = [merge_runs(self.runs[-2:])]
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        hashes = row_hashes(chunk)
+        if pass_no == 0:
+            self.n_rows += len(chunk)
+            uniq, counts = np.unique(hashes, return_counts=True)
+            self.add_hashes(uniq, counts)
+        elif len(self.dup_refs) < MAX_REFS:
+            is_dup = np.isin(hashes, self.dup_hashes)
+            add_refs(self.dup_refs, start + np.flatnonzero(is_dup))
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for hashes, counts in other.runs:
+            self.add_hashes(hashes, counts)
+        add_refs(self.dup_refs, other.dup_refs)
+        return self
+
+    def end_pass(self, pass_no):
+        if pass_no == 0:
+            if len(self.runs) > 1:
+                self.runs = [merge_runs(self.runs)]
+            hashes, counts = self.runs[0] if self.runs else (np.empty(0, dtype="uint64"), np.empty(0, dtype="int64"))
+            dup = counts > 1
+            self.dup_hashes = hashes[dup]
+            self.dup_count = int(counts[dup].sum())
+
+    def finalize(self, **kwargs):
+        if self.dup_hashes is None:
+            self.end_pass(0)
+        if not self.dup_count:
+            return []
+        n_cols = len(self.columns)
+        rows = [cell_ref(i, 0) + f":{cell_ref(i, n_cols-1)}" for i in self.dup_refs]
+        return [{
+            "column": "ALL",
+            "issue": "Full Duplicate Rows",
+            "count": self.dup_count,
+            "pct": f"{int(self.dup_count/self.n_rows*100)}%",
+            "details": "identical rows",
+            "rows": join_refs(rows, self.dup_count)
+        }]
+
+
+class NumericColumnsStream(BaseStreamAnalyzer):
+    """العمود يُعامل كرقمي فقط إذا كان رقميًا في كل الدفعات (كما لو قُرئ الملف كاملًا)."""
+
+    def __init__(self):
+        super().__init__()
+        self.non_numeric: set = set()
+
+    def numeric_columns(self, chunk: pd.DataFrame):
+        for c_idx, col in enumerate(chunk.columns):
+            if col in self.non_numeric:
+                continue
+            if not pd.api.types.is_numeric_dtype(chunk[col]):
+                self.non_numeric.add(col)
+                continue
+            yield c_idx, col
+
+
+@register_stream
+class InvalidValuesStream(NumericColumnsStream):
+    def __init__(self):
+        super().__init__()
+        self.stats: dict = {}
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        for c_idx, col in self.numeric_columns(chunk):
+            values = chunk[col].to_numpy()
+            st = self.stats.setdefault(col, {"neg": 0, "zero": 0, "neg_refs": [], "zero_refs": []})
+            neg = values < 0
+            zero = values == 0
+            st["neg"] += int(neg.sum())
+            st["zero"] += int(zero.sum())
+            add_refs(st["neg_refs"], start + np.flatnonzero(neg))
+            add_refs(st["zero_refs"], start + np.flatnonzero(zero))
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        self.non_numeric |= other.non_numeric
+        for col, st in other.stats.items():
+            mine = self.stats.setdefault(col, {"neg": 0, "zero": 0, "neg_refs": [], "zero_refs": []})
+            mine["neg"] += st["neg"]
+            mine["zero"] += st["zero"]
+            add_refs(mine["neg_refs"], st["neg_refs"])
+            add_refs(mine["zero_refs"], st["zero_refs"])
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            if col in self.non_numeric or col not in self.stats:
+                continue
+            st = self.stats[col]
+            for key, issue, details in (("neg", "Negative Values", "negative not allowed"),
+                                        ("zero", "Zero Values", "zero may be invalid")):
+                if st[key]:
+                    rows = [cell_ref(i, c_idx) for i in st[f"{key}_refs"]]
+                    issues.append({
+                        "column": col,
+                        "issue": issue,
+                        "count": st[key],
+                        "pct": f"{int(st[key]/self.n_rows*100)}%",
+                        "details": details,
+                        "rows": join_refs(rows, st[key])
+                    })
+        return issues
+
+
+@register_stream
+class OutliersStream(NumericColumnsStream):
+    """
+    القراءات الأولى تجمع إحصاءات طريقة الكشف (outliers.py) لكل عمود أو لكل مجموعة داخله
+    (متوسط وانحراف متراكم أو ملخص KLL للكميات)، والأخيرة تعد القيم خارج الحدود وتجمع مراجعها.
+    """
+    passes = 2
+
+    def __init__(self):
+        super().__init__()
+        self.detector = get_detector()
+        self.group = None
+        self.states: dict = {}
+        self.outliers: dict = {}
+        self.refs: dict = {}
+
+    def configure(self, outlier_method=None, outlier_k=None, outlier_group=None, **kwargs):
+        self.detector = get_detector(outlier_method, outlier_k)
+        self.group = outlier_group
+        self.passes = self.detector.stat_passes + 1
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        group = self.group if self.group in chunk.columns else None
+        if group:
+            # نفس مفاتيح OutliersAnalyzer (astype(str))، فالقيم الفارغة مجموعة "nan"
+            codes, uniques = pd.factorize(chunk[group].astype(str))
+        if pass_no == 0:
+            self.n_rows += len(chunk)
+            columns = list(self.numeric_columns(chunk))
+        else:
+            columns = [(c_idx, col) for c_idx, col in enumerate(chunk.columns)
+                       if col in self.states and col not in self.non_numeric]
+        for c_idx, col in columns:
+            if col == group:
+                continue
+            values = chunk[col].to_numpy(dtype="float64", na_value=np.nan)
+            if pass_no < self.passes - 1:
+                if col not in self.states:
+                    self.states[col] = self.detector.new_group_state() if group else self.detector.new_state()
+                if group:
+                    self.states[col].update(values, codes, uniques, pass_no)
+                else:
+                    self.states[col].update(values[~np.isnan(values)], pass_no)
+            else:
+                if group:
+                    low, high = self.states[col].bounds_for(uniques)
+                    low, high = low[codes], high[codes]
+                else:
+                    low, high, _ = self.states[col].bounds
+                mask = (values < low) | (values > high)
+                self.outliers[col] = self.outliers.get(col, 0) + int(mask.sum())
+                add_refs(self.refs.setdefault(col, []), start + np.flatnonzero(mask))
+
+    def end_pass(self, pass_no):
+        if pass_no < self.passes - 1:
+            for state in self.states.values():
+                state.end_pass(pass_no)
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        self.non_numeric |= other.non_numeric
+        for col, state in other.states.items():
+            self.states[col] = self.states[col].merge(state) if col in self.states else state
+        for col, cnt in other.outliers.items():
+            self.outliers[col] = self.outliers.get(col, 0) + cnt
+            add_refs(self.refs.setdefault(col, []), other.refs.get(col, []))
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            if col in self.non_numeric or not self.outliers.get(col):
+                continue
+            count = self.outliers[col]
+            state = self.states[col]
+            if isinstance(state, StreamState):
+                details = self.detector.describe(*state.bounds)
+            elif state.overflow:
+                print(f"⚠️ Warning: '{self.group}' has more than {MAX_SKETCH_GROUPS} groups; "
+                      f"outlier limits for '{col}' were computed on the whole column")
+                details = (f"{self.detector.describe(*state.total.bounds)} "
+                           f"[more than {MAX_SKETCH_GROUPS} '{self.group}' groups, limits from the whole column]")
+            else:
+                details = f"outside {self.detector.label} within each '{self.group}' group"
+            rows = [cell_ref(i, c_idx) for i in self.refs[col]]
+            issues.append({
+                "column": col,
+                "issue": "Outliers",
+                "count": count,
+                "pct": f"{int(count/self.n_rows*100)}%",
+                "details": details,
+                "rows": join_refs(rows, count)
+            })
+        return issues
+
+
+@register_stream
+class CrossFieldValueStream(BaseStreamAnalyzer):
+    """
+    نفس قواعد CrossFieldValueAnalyzer (rules أو القواعد الافتراضية) على كل دفعة؛ كل قاعدة تخص الصف نفسه.
+    القواعد التي تعطي "when" كقناع جاهز للملف كله لا تنطبق على الدفعات وتُتخطى كما يُتخطى أي خطأ في قاعدة.
+    """
+    def __init__(self):
+        super().__init__()
+        self.analyzer = CrossFieldValueAnalyzer()
+        self.entries: dict = {}
+
+    def update(self, chunk, start, pass_no=0, rules=None, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        if rules is None:
+            rules = self.analyzer.default_rules(chunk)
+        for order, col_name, issue_text, positions, details in self.analyzer.rule_hits(chunk, rules):
+            positions = np.asarray(positions)
+            self.add_entry({
+                "column": col_name,
+                "issue": issue_text,
+                "count": len(positions),
+                "refs": list(start + positions[:MAX_REFS]),
+                "first": (start + positions[0], order),
+                "last": (start + positions[-1], order),
+                "details": details(positions[-1])
+            })
+
+    def add_entry(self, part: dict) -> None:
+        key = (part["column"], part["issue"])
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = part
+            return
+        entry["count"] += part["count"]
+        # قواعد مختلفة لنفس المشكلة قد تتداخل صفوفها، فالمراجع تُرتب قبل القص
+        entry["refs"] = sorted(entry["refs"] + part["refs"])[:MAX_REFS]
+        entry["first"] = min(entry["first"], part["first"])
+        if part["last"] >= entry["last"]:
+            entry["last"] = part["last"]
+            entry["details"] = part["details"]
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for entry in other.entries.values():
+            self.add_entry(dict(entry, refs=list(entry["refs"])))
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for entry in sorted(self.entries.values(), key=lambda e: e["first"]):
+            col_name = entry["column"]
+            col_idx = self.columns.index(col_name) if col_name in self.columns else None
+            rows = [cell_ref(i, col_idx) if col_idx is not None else f"Row {i + 2}" for i in entry["refs"]]
+            issues.append({
+                "count": entry["count"],
+                "rows": join_refs(rows, entry["count"]),
+                "details": entry["details"],
+                "pct": f"{int(100 * entry['count'] / self.n_rows)}%",
+                "column": col_name,
+                "issue": entry["issue"]
+            })
+        return issues
+
+
+@register_stream
+class MixedTypeStream(BaseStreamAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.histograms: dict = {}
+        self.type_refs: dict = {}
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        for col in chunk.columns:
+            types = MixedTypeAnalyzer.classify_series(chunk[col])
+            hist = self.histograms.setdefault(col, {})
+            refs = self.type_refs.setdefault(col, {})
+            for t in pd.unique(types):
+                positions = np.flatnonzero(types == t)
+                hist[t] = hist.get(t, 0) + len(positions)
+                add_refs(refs.setdefault(t, []), start + positions)
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for col, hist in other.histograms.items():
+            mine = self.histograms.setdefault(col, {})
+            refs = self.type_refs.setdefault(col, {})
+            for t, cnt in hist.items():
+                mine[t] = mine.get(t, 0) + cnt
+                add_refs(refs.setdefault(t, []), other.type_refs[col][t])
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            hist = self.histograms.get(col, {})
+            if not hist:
+                continue
+            type_counts = pd.Series(hist).sort_values(ascending=False, kind="stable")
+            dominant_type = type_counts.index[0]
+            refs = self.type_refs[col]
+            if len(type_counts) > 1:
+                mixed_count = self.n_rows - hist[dominant_type]
+                mixed_refs = sorted(i for t, r in refs.items() if t != dominant_type for i in r)
+                issues.append({
+                    "column": col,
+                    "issue": "Mixed Data Types",
+                    "count": mixed_count,
+                    "pct": f"{int(mixed_count/self.n_rows*100)}%",
+                    "details": f"Dominant type: {dominant_type}, others: {', '.join([t for t in type_counts.index if t != dominant_type])}",
+                    "distribution": type_counts.to_dict(),
+                    "rows": join_refs([cell_ref(i, c_idx) for i in mixed_refs], mixed_count)
+                })
+            empty_count = hist.get("empty", 0)
+            empty_pct = empty_count / self.n_rows
+            if empty_pct > 0.8:
+                issues.append({
+                    "column": col,
+                    "issue": "Mostly Empty Column",
+                    "count": empty_count,
+                    "pct": f"{int(empty_pct * 100)}%",
+                    "details": "Column contains mostly empty or missing values",
+                    "rows": join_refs([cell_ref(i, c_idx) for i in refs.get("empty", [])], empty_count)
+                })
+        return issues
+
+
+@register_stream
+class TemporalErrorsStream(BaseStreamAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.state: dict = {}
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        for col in chunk.columns:
+            if 'date' not in col.lower() or not len(chunk):
+                continue
+            series = pd.to_datetime(chunk[col], errors='coerce')
+            violations = (series.diff() < pd.Timedelta(0)).to_numpy()
+            part = {
+                "first": series.iloc[0],
+                "last": series.iloc[-1],
+                "monotonic": series.is_monotonic_increasing,
+                "violations": int(violations.sum()),
+                "refs": []
+            }
+            add_refs(part["refs"], start + np.flatnonzero(violations))
+            self.merge_column(col, part, start)
+
+    def merge_column(self, col, part: dict, start: int) -> None:
+        if col not in self.state:
+            self.state[col] = part
+            return
+        st = self.state[col]
+        prev, first = st["last"], part["first"]
+        # حدود الدفعتين: نفس منطق diff() بين آخر قيمة سابقة وأول قيمة لاحقة
+        boundary_ok = pd.notna(prev) and pd.notna(first) and first >= prev
+        if pd.notna(prev) and pd.notna(first) and first < prev:
+            st["violations"] += 1
+            add_refs(st["refs"], [start])
+        st["monotonic"] = st["monotonic"] and part["monotonic"] and boundary_ok
+        st["violations"] += part["violations"]
+        add_refs(st["refs"], part["refs"])
+        st["last"] = part["last"]
+
+    def merge(self, other):
+        start = self.n_rows
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for col, part in other.state.items():
+            self.merge_column(col, dict(part, refs=list(part["refs"])), start)
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            st = self.state.get(col)
+            if st is None or st["monotonic"]:
+                continue
+            cell_refs = [f"{excel_col(c_idx)}{row + 2}" for row in st["refs"]]
+            issues.append({
+                "column": col,
+                "issue": "Time Repetition Error",
+                "count": st["violations"],
+                "pct": f"{(st['violations'] / self.n_rows * 100):.2f}%",
+                "details": "Dates not in chronological order",
+                "rows": join_refs(cell_refs, st["violations"]) if cell_refs else "-"
+            })
+        return issues
+
+
+@register_stream
+class InvalidDateValuesStream(BaseStreamAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.stats: dict = {}
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        keywords = kwargs.get("keywords", ["خطأ", "غير معروف", "n/a", "unknown", "NULL", "null", "#", "N/A", "NaT", "nat", "NAT","?","؟","#DIV/0!", "#REF!", "#VALUE!", "#NAME?", "#NULL!", "#NUM!", "#N/A"])
+        keywords_lower = [kw.lower() for kw in keywords]
+        for col in chunk.columns:
+            st = self.stats.setdefault(col, {"nulls": 0, "null_refs": [], "keywords": 0, "kw_refs": [], "matched": set()})
+            null_mask = chunk[col].isna().to_numpy()
+            st["nulls"] += int(null_mask.sum())
+            add_refs(st["null_refs"], start + np.flatnonzero(null_mask))
+            str_col = chunk[col].astype(str).str.lower()
+            keyword_mask = str_col.isin(keywords_lower)
+            if keyword_mask.any():
+                st["keywords"] += int(keyword_mask.sum())
+                st["matched"].update(str_col[keyword_mask].unique())
+                add_refs(st["kw_refs"], start + np.flatnonzero(keyword_mask.to_numpy()))
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for col, st in other.stats.items():
+            mine = self.stats.setdefault(col, {"nulls": 0, "null_refs": [], "keywords": 0, "kw_refs": [], "matched": set()})
+            mine["nulls"] += st["nulls"]
+            mine["keywords"] += st["keywords"]
+            mine["matched"] |= st["matched"]
+            add_refs(mine["null_refs"], st["null_refs"])
+            add_refs(mine["kw_refs"], st["kw_refs"])
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            st = self.stats.get(col)
+            if st is None:
+                continue
+            if st["nulls"]:
+                issues.append({
+                    "column": col,
+                    "issue": "Missing values",
+                    "count": st["nulls"],
+                    "pct": f"{(st['nulls'] / self.n_rows * 100):.2f}%",
+                    "details": "Null values or Excel Error",
+                    "rows": join_refs([cell_ref(i, c_idx) for i in st["null_refs"]], st["nulls"])
+                })
+            if st["keywords"]:
+                issues.append({
+                    "column": col,
+                    "issue": "Found Unacceptable Keyword",
+                    "count": st["keywords"],
+                    "pct": f"{(st['keywords'] / self.n_rows * 100):.2f}%",
+                    "details": f"Found keywords: {', '.join(sorted(st['matched']))}",
+                    "rows": join_refs([cell_ref(i, c_idx) for i in st["kw_refs"]], st["keywords"])
+                })
+        return issues
+
+
+@register_stream
+class InvalidDateFormatStream(BaseStreamAnalyzer):
+    """
+    نفس فحص InvalidDateFormatAnalyzer لكل دفعة (column_types أو اسم العمود، valid_formats).
+    أول قيمة في العمود تُحفظ من أول دفعة فيها قيم، لأن pd.to_datetime يستنتج الصيغة منها.
+    """
+    def __init__(self):
+        super().__init__()
+        self.stats: dict = {}
+
+    def update(self, chunk, start, pass_no=0, column_types=None, valid_formats=None, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        formats = tuple(valid_formats or InvalidDateFormatAnalyzer.default_formats)
+        col_types = InvalidDateFormatAnalyzer.date_columns(self.columns, column_types)
+        profile = frame_profile(chunk, kwargs)
+        for col in chunk.columns:
+            if col_types.get(col) != "date":
+                continue
+            st = self.stats.setdefault(col, {"first": None, "count": 0, "refs": [], "examples": []})
+            raw = InvalidDateFormatAnalyzer.clean_dates(profile[col].stripped)
+            values = pd.Series(pd.unique(raw), dtype=object)
+            if st["first"] is None and len(values):
+                st["first"] = values.iloc[0]
+            invalid = InvalidDateFormatAnalyzer.invalid_values(values, formats, st["first"])
+            failed = np.flatnonzero(chunk.index.isin(raw.index[raw.isin(invalid)]))
+            if len(failed):
+                st["count"] += len(failed)
+                add_refs(st["refs"], start + failed)
+                examples = st["examples"]
+                examples.extend(raw.loc[chunk.index[failed[:3 - len(examples)]]].tolist()[:3 - len(examples)])
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for col, st in other.stats.items():
+            mine = self.stats.setdefault(col, {"first": st["first"], "count": 0, "refs": [], "examples": []})
+            mine["count"] += st["count"]
+            add_refs(mine["refs"], st["refs"])
+            mine["examples"].extend(st["examples"][:3 - len(mine["examples"])])
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            st = self.stats.get(col)
+            if not st or not st["count"]:
+                continue
+            issues.append({
+                "column": col,
+                "issue": "Invalid Date Format",
+                "count": st["count"],
+                "pct": f"{st['count'] / self.n_rows * 100:.2f}%",
+                "details": (
+                    f"Unrecognized date in rows "
+                    f"{', '.join(map(str, st['refs'][:3]))}. "
+                    f"Examples: {', '.join(st['examples'])}"
+                ),
+                "rows": join_refs([cell_ref(i, c_idx) for i in st["refs"]], st["count"])
+            })
+        return issues
+
+
+@register_stream
+class DecimalFormatStream(BaseStreamAnalyzer):
+    """نفس فحص DecimalFormatAnalyzer.suspicious_mask لكل دفعة، مع أول 3 قيم مشبوهة للتفاصيل."""
+    def __init__(self):
+        super().__init__()
+        self.stats: dict = {}
+
+    def update(self, chunk, start, pass_no=0, **kwargs):
+        self.begin(chunk)
+        self.n_rows += len(chunk)
+        profile = frame_profile(chunk, kwargs)
+        for col in chunk.columns:
+            str_col = profile[col].stripped
+            suspicious = np.flatnonzero(DecimalFormatAnalyzer.suspicious_mask(str_col))
+            if not len(suspicious):
+                continue
+            st = self.stats.setdefault(col, {"count": 0, "refs": [], "values": []})
+            st["count"] += len(suspicious)
+            add_refs(st["refs"], start + suspicious)
+            st["values"].extend(str_col.iloc[suspicious[:3 - len(st["values"])]].tolist()[:3 - len(st["values"])])
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.columns = self.columns or other.columns
+        for col, st in other.stats.items():
+            mine = self.stats.setdefault(col, {"count": 0, "refs": [], "values": []})
+            mine["count"] += st["count"]
+            add_refs(mine["refs"], st["refs"])
+            mine["values"].extend(st["values"][:3 - len(mine["values"])])
+        return self
+
+    def finalize(self, **kwargs):
+        issues = []
+        for c_idx, col in enumerate(self.columns):
+            st = self.stats.get(col)
+            if not st:
+                continue
+            issues.append({
+                "column": col,
+                "issue": "There Are Symbols In Cells",
+                "count": st["count"],
+                "pct": f"{(st['count'] / self.n_rows * 100):.2f}%",
+                "details": f"Invalid values: {', '.join(st['values'])}" + ("..." if st["count"] > 3 else ""),
+                "rows": join_refs([cell_ref(i, c_idx) for i in st["refs"]], st["count"])
+            })
+        return issues
+
+
+def run_streaming(path: str, chunksize: int = 100_000, parse_dates: bool = False, sketches: dict = None,
+                  **kwargs) -> tuple[list[dict], str, pd.DataFrame]:
+    """
+    يحلل ملف CSV دفعة بدفعة.
+    parse_dates: أعمدة التواريخ النصية تُحوَّل في كل دفعة بالصيغة المختارة من أول دفعة فيها العمود
+    (detect_and_parse_dates مع formats مشترك بين الدفعات والقراءات).
+    sketches: dict تُضاف إليه ملخصات أعمدة الملف كله (sketches.update_sketches) في أول قراءة،
+    لتُحسب العلاقات بين الملفات من كل القيم وليس من العينة.
+    يُرجع: قائمة الأخطاء، الترميز المستخدم، وأول دفعة كعينة.
+    """
+    states = [cls() for cls in STREAM_ANALYZERS]
+    for state in states:
+        state.configure(**kwargs)
+    passes = max(s.passes for s in states)
+    encoding, sample = None, None
+    date_formats = {}
+    for pass_no in range(passes):
+        active = [s for s in states if s.passes > pass_no]
+        chunks, encoding = load_csv_chunks(path, chunksize, encoding=encoding)
+        start = 0
+        for chunk in chunks:
+            if sample is None:
+                sample = chunk
+            if sketches is not None and pass_no == 0:
+                update_sketches(sketches, chunk)
+            if parse_dates:
+                chunk = detect_and_parse_dates(chunk, formats=date_formats)
+            # ملخص أعمدة الدفعة يُبنى مرة واحدة وتتشاركه المحللات كما في analyzers.run_all
+            profile = FrameProfile(chunk)
+            for state in active:
+                state.update(chunk, start, pass_no, frame_profile=profile, **kwargs)
+            start += len(chunk)
+        # الترميز الذي اكتملت به القراءة (قد يتغير إن فشل الترميز المبدئي في منتصف الملف)
+        encoding = chunks.encoding
+        for state in active:
+            state.end_pass(pass_no)
+    results = []
+    for state in states:
+        results.extend(state.finalize(**kwargs))
+    return results, encoding, sample
@@ -1,11 +1,68 @@
 # utils.py
 import time
+import tracemalloc
+from contextlib import contextmanager
 
 class Timer:
     def __enter__(self):
         self.start = time.time()
+        self._counter = time.perf_counter()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.end = time.time()
-        self.elapsed = self.end - self.start
+        self.elapsed = time.perf_counter() - self._counter
+
+class Instrumentation:
+    """
+    يقيس كل مرحلة (load, analyze, report, ...) وكل محلل:
+    الوقت الفعلي (perf_counter)، وقت المعالج للـ thread الحالي (thread_time)،
+    وأعلى زيادة في الذاكرة أثناء التنفيذ (tracemalloc، على مستوى العملية كلها).
+    memory=True يبطئ الكود الذي يعتمد على كائنات Python بشكل ملحوظ.
+    """
+    def __init__(self, file: str = "", memory: bool = False):
+        self.file = file
+        self.memory = memory
+        self.records: list[dict] = []
+        self._stack: list[dict] = []
+
+    @contextmanager
+    def measure(self, stage: str, name: str = ""):
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        frame = {"base": 0, "peak": 0}
+        if self.memory:
+            # reset_peak يمسح قمة المرحلة الأم، لذلك تُحفظ قبلها
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            frame = {"base": current, "peak": current}
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            self._stack.pop()
+            peak_mb = None
+            if self.memory:
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                peak_mb = round((peak - frame["base"]) / 1024 ** 2, 3)
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            if started:
+                tracemalloc.stop()
+            self.records.append({
+                "file":    self.file,
+                "stage":   stage,
+                "name":    name or stage,
+                "wall_s":  round(wall, 6),
+                "cpu_s":   round(cpu, 6),
+                "peak_mb": peak_mb
+            })
+
+    def analyzer_hook(self, name: str):
+        """الـ hook الذي تستقبله run_all / run_all_db لقياس كل محلل."""
+        return self.measure("analyzer", name)